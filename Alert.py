@@ -3,25 +3,69 @@
 
 import re
 import os
-import io
-import time
+import glob
+import tempfile
 import traceback
+from contextlib import contextmanager
 import pandas as pd
 import streamlit as st
-from datetime import datetime, timezone, timedelta, date, time as dtime
-from dateutil import parser
-import pandas.api.types as ptypes
+from datetime import datetime, date, time as dtime
 import streamlit.components.v1 as components
 
-# Optional: Mistral AI client
-try:
-    from mistralai import Mistral
-except Exception:
-    Mistral = None
+from alert_core import (
+    BackgroundParse,
+    DISK_CACHE_DIR,
+    DISK_CACHE_MAX_MB,
+    DiskParseCache,
+    EXPORT_FORMATS,
+    FLEET_LOG_PATTERNS,
+    FollowedLog,
+    LOCAL_TZ,
+    LazyFileLines,
+    PYARROW_AVAILABLE,
+    ParseCache,
+    TextIndex,
+    compare_two_parsed_lists,
+    concat_frames,
+    discover_logs,
+    error_frequency,
+    estimate_entry_size,
+    events_frame,
+    fleet_summary,
+    merge_instance_info,
+    merge_previews,
+    observed_counts,
+    parse_alert_log_chunked,
+    parse_alert_log_file,
+    parse_cache_key,
+    parse_files_parallel,
+    parse_logs,
+    preview_alert_log,
+    read_context,
+    read_head_lines,
+    search_mask,
+    sort_by_time,
+    source_name_for,
+    time_bounds,
+    time_window,
+    write_export,
+)
+from alert_ai import AI_MAX_CHUNKS, AIClient, AIError, AIResponseCache, chunk_text, summarize
 
 # ---------------- Config ----------------
-LOCAL_TZ = timezone(timedelta(hours=5, minutes=30))  # IST +05:30
-MAX_PROMPT_CHARS = 9000
+MAX_PROMPT_CHARS = 9000  # log text per AI request; an analysis sends up to AI_MAX_CHUNKS of them
+AI_MAX_CHARS = MAX_PROMPT_CHARS * AI_MAX_CHUNKS
+PARSE_CACHE_MAX_MB = int(os.getenv("ALERT_PARSE_CACHE_MB", "1024"))
+PARSE_WORKERS = int(os.getenv("ALERT_PARSE_WORKERS", str(os.cpu_count() or 1)))
+CHUNKED_PARSE_MIN_MB = int(os.getenv("ALERT_CHUNKED_PARSE_MB", "64"))  # split single files at least this big
+PREVIEW_MIN_MB = int(os.getenv("ALERT_PREVIEW_MB", "16"))  # show sampled estimates while uploads this big parse
+BACKGROUND_PARSE_MIN_MB = int(os.getenv("ALERT_BACKGROUND_PARSE_MB", "32"))  # parse uploads this big off the script thread
+BACKGROUND_REFRESH_SECONDS = 1  # how often the dashboard picks up new background parse results
+FOLLOW_GLOB = os.getenv("ALERT_FOLLOW_GLOB", os.path.join("$ORACLE_BASE", "diag", "rdbms", "*", "*", "trace", "alert_*.log"))
+FOLLOW_REFRESH_SECONDS = int(os.getenv("ALERT_FOLLOW_REFRESH_SECONDS", "10"))
+FLEET_ROOT = os.getenv("ALERT_FLEET_ROOT", "")
+TEXT_SEARCH_MAX_HITS = 1000  # raw line matches listed by the full-text search
+EXPORT_LABELS = {"xlsx": "Excel (.xlsx)", "csv": "CSV (.zip)", "parquet": "Parquet (.zip)", "jsonl": "JSON Lines"}
 
 st.set_page_config(
     page_title="Oracle Alert Log Analyzer",
@@ -422,336 +466,31 @@ def speak_text(text):
     
     components.html(speech_html, height=0)
 
-# ---------------- Regex & Helpers ----------------
-TIMESTAMP_RE = re.compile(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+(?:[\+\-]\d{2}:\d{2}))")
-ORA_RE = re.compile(r"\bORA-(\d{3,5}):?\s*(.*)")
-WARN_RE = re.compile(r"\bWARNING\b|\bWarning\b|\bwarning\b")
-TRACE_RE = re.compile(r"(\/[\w\/\.\-\+]*\.trc)")
-KILL_SESSION_RE = re.compile(r"KILL SESSION for sid=\((\d+),\s*(\d+)\)", re.IGNORECASE)
-
-def lines_from_uploaded_file(f):
-    raw = f.read().decode("utf-8", errors="ignore")
-    return raw.splitlines()
-
-def analyze_alert_log_lines(lines, source_name="uploaded"):
-    ora_errors = []
-    warnings = []
-    kill_sessions = []
-    current_timestamp = None
-
-    trace_locations = [(i, TRACE_RE.search(line).group(1)) for i, line in enumerate(lines) if TRACE_RE.search(line)]
-
-    def find_nearby_trace(idx):
-        for t_idx, t_path in trace_locations:
-            if 0 <= t_idx - idx <= 5:
-                return t_path
-        return "Not Found"
-    
-    def extract_kill_session_details(start_idx, lines):
-        """Extract detailed information from KILL SESSION block - OPTIMIZED"""
-        details = {
-            "reason": "Not Found",
-            "mode": "Not Found",
-            "requestor": "Not Found",
-            "owner": "Not Found",
-            "result": "Not Found",
-            "full_block": []
-        }
-        
-        # Look ahead up to 10 lines for details
-        end_range = min(start_idx + 10, len(lines))
-        for j in range(start_idx, end_range):
-            line = lines[j]
-            details["full_block"].append(line)
-            
-            line_stripped = line.strip()
-            
-            if "Reason =" in line_stripped:
-                details["reason"] = line_stripped.split("Reason =", 1)[1].strip()
-            elif "Mode =" in line_stripped:
-                details["mode"] = line_stripped.split("Mode =", 1)[1].strip()
-            elif "Requestor =" in line_stripped:
-                details["requestor"] = line_stripped.split("Requestor =", 1)[1].strip()
-            elif "Owner =" in line_stripped:
-                details["owner"] = line_stripped.split("Owner =", 1)[1].strip()
-            elif "Result =" in line_stripped:
-                details["result"] = line_stripped.split("Result =", 1)[1].strip()
-            
-            # Stop early if we hit another timestamp or KILL SESSION
-            if j > start_idx and (TIMESTAMP_RE.search(line_stripped) or KILL_SESSION_RE.search(line_stripped)):
-                break
-        
-        return details
-
-    for i, raw in enumerate(lines):
-        line = raw.rstrip("\n")
-        if not line.strip():
-            continue
-
-        ts_m = TIMESTAMP_RE.search(line)
-        if ts_m:
-            current_timestamp = ts_m.group(1)
-            continue
-
-        # Check for KILL SESSION event
-        kill_m = KILL_SESSION_RE.search(line)
-        if kill_m:
-            sid = kill_m.group(1)
-            serial = kill_m.group(2)
-            details = extract_kill_session_details(i, lines)
-            
-            kill_sessions.append({
-                "Timestamp": current_timestamp or "Not Found",
-                "SID": sid,
-                "Serial#": serial,
-                "Reason": details["reason"],
-                "Mode": details["mode"],
-                "Requestor": details["requestor"],
-                "Owner": details["owner"],
-                "Result": details["result"],
-                "Trace File": find_nearby_trace(i),
-                "Source": source_name,
-                "Raw Line": line,
-                "Full Block": "\n".join(details["full_block"])
-            })
-            continue
-
-        ora_m = ORA_RE.search(line)
-        if ora_m:
-            code = f"ORA-{ora_m.group(1)}"
-            if code not in {"ORA-0"}:
-                ora_errors.append({
-                    "Timestamp": current_timestamp or "Not Found",
-                    "ORA Error": code,
-                    "Trace File": find_nearby_trace(i),
-                    "Source": source_name,
-                    "Raw Line": line,
-                })
-        elif WARN_RE.search(line):
-            warnings.append({
-                "Timestamp": current_timestamp or "Not Found",
-                "Warning Message": line.strip(),
-                "Trace File": find_nearby_trace(i),
-                "Source": source_name,
-                "Raw Line": line,
-            })
-
-    return ora_errors, warnings, kill_sessions
-
-def parse_iso_timestamp(ts):
-    if not ts or ts == "Not Found":
-        return None
-    try:
-        dt = parser.isoparse(ts)
-        if dt.tzinfo is None:
-            dt = dt.replace(tzinfo=LOCAL_TZ)
-        return dt
-    except Exception:
-        try:
-            dt = parser.parse(ts, fuzzy=True)
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=LOCAL_TZ)
-            return dt
-        except Exception:
-            return None
-
-
-def detect_instance_summary_and_events(all_lines):
-    """
-    Scans a list of raw log lines and extracts instance names, hostnames,
-    releases, startup events, shutdown events, crash events,
-    ALTER commands, and RESIZE commands.
-    """
-
-    info = {
-        "Instance Names": set(),
-        "Hostnames": set(),
-        "Oracle Releases": set(),
-        "Startup Events": [],
-        "Shutdown Events": [],
-        "Crash Events": [],
-        "Alter Commands": [],
-        "Resize Commands": []        # ⭐ NEW
-    }
-
-    release_re = re.compile(r"(Release\s+\d+(?:\.\d+)*)", re.I)
-    start_re = re.compile(r"(Starting\s+ORACLE\s+instance|PMON has started|Starting up ORACLE)", re.I)
-    shutdown_re = re.compile(r"(Shutting down|shutdown\s+complete|Shutdown\s+normal|shutdown complete)", re.I)
-    crash_re = re.compile(
-        r"(Instance terminated|terminated abnormally|abort|crash|ORA-00600|ORA-07445|core dump|ORA-609)",
-        re.I
-    )
-    inst_re = re.compile(r"Instance\s+name[:\s]*([A-Za-z0-9_\-\.]+)", re.I)
-    host_re = re.compile(r"Host\s*[:=]\s*([A-Za-z0-9\-\._]+)", re.I)
-
-    # ⭐ NEW: Detect ANY ALTER command
-    alter_re = re.compile(r"\bALTER\s+[A-Z_]+\b", re.I)
-
-    # ⭐ NEW: Detect ANY RESIZE command
-    resize_re = re.compile(r"\bRESIZE\b", re.I)
-
-    ts_re = TIMESTAMP_RE
-    last_ts = None  # store last timestamp
-
-    for idx, line in enumerate(all_lines):
-        text = line.rstrip("\n")
-
-        # Timestamp detection
-        ts_match = ts_re.search(text)
-        if ts_match:
-            last_ts = ts_match.group(1)
-
-        # instance / release / host detection
-        rel = release_re.search(text)
-        if rel:
-            info["Oracle Releases"].add(rel.group(1))
-
-        inst = inst_re.search(text)
-        if inst:
-            info["Instance Names"].add(inst.group(1))
-
-        host = host_re.search(text)
-        if host:
-            info["Hostnames"].add(host.group(1))
-
-        # ⭐ NEW: Detect ALTER commands
-        if alter_re.search(text):
-            info["Alter Commands"].append({
-                "Timestamp": last_ts or "Not Found",
-                "Line": text.strip(),
-                "Index": idx
-            })
-            continue
-
-        # ⭐ NEW: Detect RESIZE commands
-        if resize_re.search(text):
-            info["Resize Commands"].append({
-                "Timestamp": last_ts or "Not Found",
-                "Line": text.strip(),
-                "Index": idx
-            })
-            continue
-
-        # Startup event
-        if start_re.search(text):
-            info["Startup Events"].append({
-                "Timestamp": last_ts or "Not Found",
-                "Line": text.strip(),
-                "Index": idx
-            })
-            continue
-
-        # Shutdown event
-        if shutdown_re.search(text):
-            info["Shutdown Events"].append({
-                "Timestamp": last_ts or "Not Found",
-                "Line": text.strip(),
-                "Index": idx
-            })
-            continue
-
-        # Crash event
-        if crash_re.search(text):
-            info["Crash Events"].append({
-                "Timestamp": last_ts or "Not Found",
-                "Line": text.strip(),
-                "Index": idx
-            })
-            continue
-
-    # Convert sets to sorted lists
-    for k in ["Instance Names", "Hostnames", "Oracle Releases"]:
-        info[k] = sorted(info[k])
-
-    return info
-
-# ---------------- Compare Two Parsed Lists ----------------
-def compare_two_parsed_lists(list_a, list_b):
+# ---------------- Mistral AI Section ----------------
+def ai_generate(lines, instruction, error_summary, cache=None) -> str:
     """
-    Compare two parsed alert log lists (ORA errors, warnings, kill sessions).
-    list_a and list_b should be lists of dictionaries.
-
-    Returns:
-        {
-            "counts": DataFrame comparing count of ORA errors,
-            "new_in_b": items that exist only in B,
-            "new_in_a": items that exist only in A
-        }
+    Map-reduce Mistral summary of log lines (see alert_ai.summarize), with Oracle Support links.
+    Replies already in `cache` (an AIResponseCache) skip the request.
     """
-    import pandas as pd
-
-    # Convert lists to DataFrame
-    df_a = pd.DataFrame(list_a)
-    df_b = pd.DataFrame(list_b)
-
-    # ---- Compare ORA counts ----
-    if "ORA Error" in df_a.columns and "ORA Error" in df_b.columns:
-        counts_a = df_a["ORA Error"].value_counts().rename("Count_A")
-        counts_b = df_b["ORA Error"].value_counts().rename("Count_B")
-        counts = pd.concat([counts_a, counts_b], axis=1).fillna(0).astype(int)
-    else:
-        counts = pd.DataFrame()
-
-    # ---- Unique in B (new) ----
-    df_a_keys = df_a.astype(str).agg("|".join, axis=1).tolist()
-    df_b_keys = df_b.astype(str).agg("|".join, axis=1).tolist()
-
-    new_in_b = [b for bkey, b in zip(df_b_keys, list_b) if bkey not in df_a_keys]
-
-    # ---- Unique in A (missing in B) ----
-    new_in_a = [a for akey, a in zip(df_a_keys, list_a) if akey not in df_b_keys]
-
-    return {
-        "counts": counts.reset_index().rename(columns={"index": "ORA Error"}),
-        "new_in_b": new_in_b,
-        "new_in_a": new_in_a
-    }
-
-
-# ---------------- Mistral AI Section ----------------
-def ai_generate(prompt: str) -> str:
     try:
         api_key = os.getenv("MISTRAL_API_KEY")
         if not api_key:
             return "⚠️ AI Error: MISTRAL_API_KEY not found in environment."
-        if Mistral is None:
-            return "⚠️ Mistral client not installed."
-
-        client = Mistral(api_key=api_key)
-        messages = [
-            {
-                "role": "system",
-                "content": (
-                    "You are an Oracle DBA expert. Analyze ONLY the provided alert log text. "
-                    "Do NOT invent or assume additional ORA errors not present in the provided logs. "
-                    "If no ORA or warnings exist in the supplied segment, explicitly state that. "
-                    "Provide a concise summary suitable for production DBAs (3–5 sentences)."
-                ),
-            },
-            {"role": "user", "content": prompt},
-        ]
-
-        ai_summary = None
-        for attempt in range(3):
-            try:
-                response = client.chat.complete(
-                    model="mistral-large-latest",
-                    messages=messages,
-                    temperature=0.2,
-                )
-                ai_summary = response.choices[0].message.content.strip()
-                break
-            except Exception as e:
-                msg = str(e)
-                if any(x in msg.lower() for x in ["timeout", "connection", "reset", "429", "capacity", "10054"]):
-                    if attempt < 2:
-                        time.sleep(5 * (attempt + 1))
-                        continue
-                return f"⚠️ AI Error: {msg}"
-        else:
-            return "⚠️ Mistral API connection issue persisted."
 
-        ora_codes = sorted(set(re.findall(r"\bORA-\d{3,5}\b", prompt)))
+        try:
+            ai_summary, stats = summarize(AIClient(api_key, cache=cache), lines, instruction, error_summary,
+                                          chunk_chars=MAX_PROMPT_CHARS)
+        except AIError as e:
+            return f"⚠️ AI Error: {e}"
+
+        coverage = f"\n\n_Summarized {stats['chunks']} chunk(s) of the log in {stats['requests']} request(s)"
+        if stats["cached"]:
+            coverage += f", {stats['cached']} reply(ies) from the AI cache"
+        if stats["failed"]:
+            coverage += f"; {stats['failed']} request(s) failed after retries and are missing from the summary"
+        coverage += "._"
+
+        ora_codes = sorted(set(re.findall(r"\bORA-\d{3,5}\b", "\n".join(lines) + "\n" + error_summary)))
         if ora_codes:
             link_lines = ["\n\n### 🔗 Related Oracle Support Links"]
             for code in ora_codes:
@@ -766,7 +505,7 @@ def ai_generate(prompt: str) -> str:
             "**⚠️ Note:** Since the recommendations are generated through AI-based analysis, they may not always be fully accurate. For validation and further details, please refer to the official Oracle Support documentation and knowledge base articles linked below."
         )
 
-        return f"### 🧠 AI Summary\n{ai_summary}{ai_note}{ora_links_block}"
+        return f"### 🧠 AI Summary\n{ai_summary}{coverage}{ai_note}{ora_links_block}"
 
     except Exception as e:
         return f"⚠️ AI Error: {str(e)}"
@@ -779,9 +518,121 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
-uploaded_files = st.file_uploader("", type=["log","txt"], accept_multiple_files=True, label_visibility="collapsed")
+# Cancelling a background parse bumps the nonce, which gives an empty uploader and lets the upload go
+uploaded_files = st.file_uploader("", type=["log","txt"], accept_multiple_files=True, label_visibility="collapsed",
+                                  key=f"uploader_{st.session_state.get('uploader_nonce', 0)}") or []
+
+# Parse uploaded files (results are cached across reruns by content hash)
+if "parse_cache" not in st.session_state:
+    st.session_state.parse_cache = ParseCache(PARSE_CACHE_MAX_MB * 1024 * 1024)
+parse_cache = st.session_state.parse_cache
+# ...and across sessions / restarts on disk (Parquet), when pyarrow is installed
+if "disk_parse_cache" not in st.session_state:
+    st.session_state.disk_parse_cache = DiskParseCache(DISK_CACHE_DIR, DISK_CACHE_MAX_MB * 1024 * 1024)
+disk_parse_cache = st.session_state.disk_parse_cache
+
+# ---------------- Parsing Options ----------------
+parallel_parsing = st.sidebar.checkbox("⚡ Parallel parsing", value=True, key="parallel_parsing_toggle",
+                                       help="Parse several uploaded logs at once in separate processes, "
+                                            f"and split logs over {CHUNKED_PARSE_MIN_MB} MB across processes")
+parse_workers = int(st.sidebar.number_input("Parser processes", min_value=1, max_value=64,
+                                            value=max(1, min(PARSE_WORKERS, 64)), key="parse_workers",
+                                            disabled=not parallel_parsing))
+background_parsing = st.sidebar.checkbox("🧵 Background parsing", value=True, key="background_parsing_toggle",
+                                         help=f"Parse uploads over {BACKGROUND_PARSE_MIN_MB} MB on a worker thread and "
+                                              "show results as they arrive, with a cancel button")
+
+# ---------------- Follow Mode (live local logs) ----------------
+st.sidebar.markdown("### 📡 Live Logs")
+follow_mode = st.sidebar.checkbox("Follow local alert logs", value=False, key="follow_mode_toggle",
+                                  help="Read alert logs straight from this host's filesystem and parse only "
+                                       "what was appended since the last refresh")
+followed_logs = []
+if follow_mode:
+    follow_glob = st.sidebar.text_input("Log path pattern", value=FOLLOW_GLOB, key="follow_glob")
+    follow_interval = int(st.sidebar.number_input("Auto-refresh every (s, 0 = off)", min_value=0, max_value=3600,
+                                                  value=FOLLOW_REFRESH_SECONDS, key="follow_interval"))
+    if "followed_logs" not in st.session_state:
+        st.session_state.followed_logs = {}
+    follow_state = st.session_state.followed_logs
+
+    follow_paths = sorted(glob.glob(os.path.expanduser(os.path.expandvars(follow_glob))))
+    for path in set(follow_state) - set(follow_paths):
+        del follow_state[path]
+    for path in follow_paths:
+        log = follow_state.setdefault(path, FollowedLog(path))
+        rotations = log.rotations
+        try:
+            log.refresh()
+        except OSError as e:
+            st.sidebar.warning(f"⚠️ {path}: {e}")
+            continue
+        if log.rotations != rotations:
+            st.sidebar.info(f"🔄 {os.path.basename(path)} was rotated or truncated; re-read from the start")
+        followed_logs.append(log)
+    st.sidebar.caption(f"Following {len(followed_logs)} file(s)" if followed_logs else "No files match the pattern")
+
+    if follow_interval and followed_logs and hasattr(st, "fragment"):
+        # Stat the files on a timer; only a real change reruns the whole dashboard
+        @st.fragment(run_every=follow_interval)
+        def watch_followed_logs():
+            if any(log.changed() for log in followed_logs):
+                st.rerun(scope="app")
+
+        watch_followed_logs()
+
+# ---------------- Fleet Scan (directory tree of alert logs) ----------------
+st.sidebar.markdown("### 🌐 Fleet Scan")
+fleet_mode = st.sidebar.checkbox("Scan a directory of alert logs", value=False, key="fleet_mode_toggle",
+                                 help="Find every alert_*.log under a root directory and summarize them per host/instance")
+fleet_logs = []
+fleet_summary_df = None
+if fleet_mode:
+    fleet_root = st.sidebar.text_input("Fleet root directory", value=FLEET_ROOT, key="fleet_root").strip()
+    fleet_window = None
+    if st.sidebar.checkbox("Only read a time window", value=False, key="fleet_window_toggle",
+                           help="Binary-search each (chronological) log by timestamp and parse only this range"):
+        today = datetime.now(LOCAL_TZ).date()
+        win_start_date = st.sidebar.date_input("Window start date", value=today, key="fleet_win_start_date")
+        win_start_time = st.sidebar.time_input("Window start time", value=dtime(0, 0), key="fleet_win_start_time")
+        win_end_date = st.sidebar.date_input("Window end date", value=today, key="fleet_win_end_date")
+        win_end_time = st.sidebar.time_input("Window end time", value=dtime(23, 59, 59), key="fleet_win_end_time")
+        fleet_window = (pd.Timestamp(datetime.combine(win_start_date, win_start_time).replace(tzinfo=LOCAL_TZ)),
+                        pd.Timestamp(datetime.combine(win_end_date, win_end_time).replace(tzinfo=LOCAL_TZ)))
+    rescan = st.sidebar.button("🔄 Scan fleet", key="fleet_rescan", use_container_width=True)
+    fleet_state = st.session_state.get("fleet_scan")
+    if fleet_root and (rescan or fleet_state is None or fleet_state["root"] != fleet_root
+                       or fleet_state.get("window") != fleet_window):
+        try:
+            fleet_paths = discover_logs([fleet_root], FLEET_LOG_PATTERNS)
+        except FileNotFoundError:
+            st.sidebar.warning(f"⚠️ {fleet_root} does not exist")
+            fleet_paths = []
+        fleet_files = [(source_name_for(path, [fleet_root]), path) for path in fleet_paths]
+        fleet_bar = st.sidebar.progress(0.0, text=f"Scanning {len(fleet_files)} log(s)...")
+        scanned = []
+
+        def report_fleet_progress(name):
+            scanned.append(name)
+            fleet_bar.progress(len(scanned) / len(fleet_files), text=f"Scanned {len(scanned)}/{len(fleet_files)}")
+
+        # Unchanged files come straight from the disk cache; windowed scans read only their byte range
+        fleet_entries = parse_logs(fleet_files, workers=parse_workers if parallel_parsing else 1,
+                                   cache=disk_parse_cache, progress=report_fleet_progress, window=fleet_window)
+        fleet_bar.empty()
+        names = [name for name, _ in fleet_files]
+        fleet_state = st.session_state.fleet_scan = {
+            "root": fleet_root,
+            "window": fleet_window,
+            "logs": [(name, path, entry) for (name, path), entry in zip(fleet_files, fleet_entries)],
+            "summary": fleet_summary(fleet_entries, names),
+        }
+    if fleet_state is not None and fleet_state["root"] == fleet_root:
+        fleet_logs = fleet_state["logs"]
+        fleet_summary_df = fleet_state["summary"]
+        st.sidebar.caption(f"{len(fleet_logs)} alert log(s) under {fleet_root}")
 
-if not uploaded_files:
+if not uploaded_files and not followed_logs and not fleet_logs:
     st.markdown("""
     <div style='background: white; padding: 3rem; border-radius: 12px; text-align: center; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);'>
         <h2 style='color: #667eea; margin-bottom: 1rem;'>👋 Welcome!</h2>
@@ -791,54 +642,259 @@ if not uploaded_files:
     """, unsafe_allow_html=True)
     st.stop()
 
-# Parse uploaded files
-all_raw_lines = []
-per_file_lines = {}
-combined_ora = []
-combined_warnings = []
-combined_kill_sessions = []
+# ---------------- Quick Look (estimates while parsing) ----------------
+def render_preview(preview):
+    """Quick Statistics estimated by merge_previews(), shown until the exact parse finishes."""
+    st.markdown("### 📊 Quick Statistics (estimated)")
+    st.caption(f"⏳ Quick look at {preview['sampled_bytes'] / 2**20:.1f} MB of {preview['size'] / 2**20:.1f} MB "
+               f"— approximate until parsing finishes")
+    counts = preview["counts"]
+    values = [
+        ("📄 Files Uploaded", str(preview["Source"])),
+        ("🔴 ORA Errors", f"~{counts['ora']:,}"),
+        ("🟡 Warnings", f"~{counts['warnings']:,}"),
+        ("⚡ Kill Sessions", f"~{counts['kill_sessions']:,}"),
+        ("🔢 Unique ORA Codes", f"≥{len(preview['ora_codes'])}"),
+    ]
+    for (label, value), col in zip(values, [st] * 5 if mobile_view else st.columns(5)):
+        col.metric(label, value)
+    first, last = preview["first_timestamp"], preview["last_timestamp"]
+    if first is not None and last is not None:
+        st.caption(f"🕒 Approximate span: {first.strftime('%Y-%m-%d %H:%M:%S')} → {last.strftime('%Y-%m-%d %H:%M:%S')}")
+    st.caption(" · ".join(f"{k}: {', '.join(preview[k]) or 'N/A'}"
+                          for k in ("Instance Names", "Hostnames", "Oracle Releases")))
+    sampled = sum(preview["ora_codes"].values())
+    if sampled:
+        mix = pd.DataFrame(preview["ora_codes"].most_common(10), columns=["ORA Error", "Sampled Hits"])
+        mix["Share"] = (mix["Sampled Hits"] / sampled).map("{:.0%}".format)
+        st.dataframe(mix, use_container_width=True, hide_index=True)
+
+
+def render_parse_job(job):
+    """Progress of a BackgroundParse, with the cancel button; reruns the app as new results arrive."""
+    mb = 1024 * 1024
+    eta = job.eta()
+    text = (f"🧵 Parsing in the background: {job.bytes_done / mb:.1f} of {job.total_bytes / mb:.1f} MB, "
+            f"{job.rows:,} rows so far" + (f", about {eta:.0f}s left" if eta is not None else ""))
+    st.progress(job.bytes_done / job.total_bytes if job.total_bytes else 0.0, text=text)
+    if st.button("✖ Cancel parsing", key="cancel_parse"):
+        job.cancel()
+        del st.session_state["parse_job"]
+        st.session_state.uploader_nonce = st.session_state.get("uploader_nonce", 0) + 1
+        st.rerun()
+
+    if hasattr(st, "fragment"):
+        @st.fragment(run_every=BACKGROUND_REFRESH_SECONDS)
+        def watch_parse_job(job, version):
+            if job.done or job.version != version:
+                st.rerun(scope="app")
+
+        watch_parse_job(job, job.version)
+
+
+per_file_lines = LazyFileLines()
+per_file_entries = {}
+merged_entries = []  # every source's entry, including same-named ones that share a per_file_entries slot
+per_file_info = []
+ora_frames, warn_frames, kill_frames = [], [], []
+ora_search, warn_search, kill_search = [], [], []
 
 with st.spinner("📄 Processing uploaded files..."):
+    upload_keys = []
+    pending = []
+    fresh = {}
+    # Each upload is hashed once: later reruns look its key up by the uploader's file_id
+    known_keys = st.session_state.setdefault("upload_cache_keys", {})
+    for file_id in set(known_keys) - {getattr(f, "file_id", None) for f in uploaded_files}:
+        del known_keys[file_id]
     for f in uploaded_files:
         name = getattr(f, "name", "uploaded")
-        lines = lines_from_uploaded_file(f)
-        per_file_lines[name] = lines
-        all_raw_lines.append(f"--- BEGIN FILE: {name} ---")
-        all_raw_lines.extend(lines)
-        all_raw_lines.append(f"--- END FILE: {name} ---")
-        o, w, k = analyze_alert_log_lines(lines, source_name=name)
-        combined_ora.extend(o)
-        combined_warnings.extend(w)
-        combined_kill_sessions.extend(k)
-
-df_ora_all = pd.DataFrame(combined_ora) if combined_ora else pd.DataFrame(columns=["Timestamp","ORA Error","Trace File","Source","Raw Line"])
-df_warn_all = pd.DataFrame(combined_warnings) if combined_warnings else pd.DataFrame(columns=["Timestamp","Warning Message","Trace File","Source","Raw Line"])
-df_kill_all = pd.DataFrame(combined_kill_sessions) if combined_kill_sessions else pd.DataFrame(columns=["Timestamp","SID","Serial#","Reason","Mode","Requestor","Owner","Result","Trace File","Source","Raw Line","Full Block"])
-
-if not df_ora_all.empty:
-    df_ora_all["ParsedTimestamp"] = df_ora_all["Timestamp"].apply(parse_iso_timestamp)
-else:
-    df_ora_all["ParsedTimestamp"] = pd.Series(dtype="datetime64[ns]")
+        file_id = getattr(f, "file_id", None)
+        cache_key = known_keys.get(file_id) if file_id is not None else None
+        if cache_key is None:
+            cache_key = parse_cache_key(f, name)
+            if file_id is not None:
+                known_keys[file_id] = cache_key
+        upload_keys.append((f, name, cache_key))
+        if cache_key in parse_cache or cache_key in fresh or any(cache_key == k for _, _, k in pending):
+            continue
+        stored = disk_parse_cache.get(cache_key)
+        if stored is not None:
+            fresh[cache_key] = stored
+        else:
+            pending.append((f, name, cache_key))
+
+    # Big uploads parse on a worker thread; meanwhile each rerun shows the tables found so far
+    parse_job = st.session_state.get("parse_job")
+    pending_key = tuple(cache_key for _, _, cache_key in pending)
+    if parse_job is not None and parse_job["key"] != pending_key:
+        parse_job["job"].cancel()
+        parse_job = st.session_state.parse_job = None
+    partial_entries = {}
+    if pending and background_parsing and sum(f.size for f, _, _ in pending) >= BACKGROUND_PARSE_MIN_MB * 1024 * 1024:
+        if parse_job is None:
+            parse_job = st.session_state.parse_job = {
+                "key": pending_key,
+                "job": BackgroundParse([(name, f.getbuffer()) for f, name, _ in pending],
+                                       workers=parse_workers if parallel_parsing else 1),
+                "preview": merge_previews([preview_alert_log(f, name) for f, name, _ in pending])
+                           if sum(f.size for f, _, _ in pending) >= PREVIEW_MIN_MB * 1024 * 1024 else None,
+            }
+        job = parse_job["job"]
+        if job.done and job.error is None:
+            for idx, (_, _, cache_key) in enumerate(pending):
+                fresh[cache_key] = job.entries[idx]
+                disk_parse_cache.put(cache_key, fresh[cache_key])
+            parse_job = st.session_state.parse_job = None
+            pending = []
+        elif job.done:
+            st.warning(f"⚠️ Background parsing failed ({job.error}); parsing in the foreground instead")
+            parse_job = st.session_state.parse_job = None
+        else:
+            if parse_job["preview"] is not None:
+                render_preview(parse_job["preview"])
+            render_parse_job(job)
+            # Keyed like the caches: same-named uploads each keep their own rows
+            partial_entries = {pending[idx][2]: entry for idx, entry in job.snapshot().items()}
+            pending = []
+
+    if pending:
+        # Head, tail and evenly spaced byte ranges of big uploads give estimates within a second
+        preview_box = st.empty()
+        if sum(f.size for f, _, _ in pending) >= PREVIEW_MIN_MB * 1024 * 1024:
+            with preview_box.container():
+                render_preview(merge_previews([preview_alert_log(f, name) for f, name, _ in pending]))
+        progress_bar = st.progress(0.0, text=f"📄 Parsing {len(pending)} file(s)...")
+
+        def report_progress(done, total, name):
+            progress_bar.progress(done / total, text=f"📄 Parsed {name} ({done}/{total})")
+
+        def report_chunk_progress(done, total, name):
+            progress_bar.progress(done / total, text=f"📄 Parsing {name}: chunk {done}/{total}")
+
+        use_pool = parallel_parsing and parse_workers > 1
+        large = [p for p in pending if use_pool and p[0].size >= CHUNKED_PARSE_MIN_MB * 1024 * 1024]
+        rest = [p for p in pending if p not in large]
+
+        # One big log: split it into byte ranges across all workers
+        for f, name, cache_key in large:
+            fresh[cache_key] = parse_alert_log_chunked(
+                f.getvalue(), name, max_workers=parse_workers, progress=report_chunk_progress
+            )
+
+        if use_pool and len(rest) > 1:
+            parsed = parse_files_parallel(
+                [(name, f.getvalue()) for f, name, _ in rest],
+                max_workers=parse_workers,
+                progress=report_progress,
+            )
+        else:
+            parsed = []
+            for n, (f, name, _) in enumerate(rest, 1):
+                parsed.append(parse_alert_log_file(f, name))
+                report_progress(n, len(rest), name)
+        for (_, _, cache_key), entry in zip(rest, parsed):
+            fresh[cache_key] = entry
+
+        progress_bar.empty()
+        preview_box.empty()
+        for _, _, cache_key in pending:
+            disk_parse_cache.put(cache_key, fresh[cache_key])
+
+    for cache_key, entry in fresh.items():
+        parse_cache.put(cache_key, entry, estimate_entry_size(entry))
+
+    # Merge in upload order, followed logs last
+    sources = [(name, f, fresh.get(cache_key) or parse_cache.get(cache_key) or partial_entries.get(cache_key))
+               for f, name, cache_key in upload_keys]
+    sources += [(log.source_name, log.path, log.entry) for log in followed_logs]
+    sources += fleet_logs
+    for name, source, entry in sources:
+        if entry is None:
+            continue  # nothing from this file's background parse yet
+        per_file_lines.add(name, source)
+        per_file_entries[name] = entry
+        merged_entries.append(entry)
+        per_file_info.append(entry["info"])
+        ora_frames.append(entry["df_ora"])
+        warn_frames.append(entry["df_warn"])
+        kill_frames.append(entry["df_kill"])
+        ora_search.append(entry["search"]["ora"])
+        warn_search.append(entry["search"]["warnings"])
+        kill_search.append(entry["search"]["kill_sessions"])
+
+if not per_file_entries:
+    st.stop()  # the background parse has nothing to show yet; watch_parse_job() reruns once it does
+
+# Merged tables sorted by ParsedTimestamp, rebuilt only when the set of parsed entries changes;
+# every date/time window below is then two binary searches and a slice (time_window)
+merge_key = tuple(id(entry) for entry in merged_entries)
+merged = st.session_state.get("merged_frames")
+if merged is None or merged["key"] != merge_key:
+    merged = st.session_state.merged_frames = {
+        "key": merge_key,
+        "entries": merged_entries,  # keeps the ids in the key alive
+        "tables": [
+            sort_by_time(concat_frames(frames), pd.concat(search, ignore_index=True))
+            for frames, search in ((ora_frames, ora_search), (warn_frames, warn_search), (kill_frames, kill_search))
+        ],
+        "info": merge_instance_info(per_file_info),
+        "events": {},
+    }
+# Pre-lowercased search text, row-aligned with the tables
+(df_ora_all, search_ora_all), (df_warn_all, search_warn_all), (df_kill_all, search_kill_all) = merged["tables"]
 
-if not df_warn_all.empty:
-    df_warn_all["ParsedTimestamp"] = df_warn_all["Timestamp"].apply(parse_iso_timestamp)
-else:
-    df_warn_all["ParsedTimestamp"] = pd.Series(dtype="datetime64[ns]")
+# ---------------- Lazy Panels ----------------
+def fragment(func):
+    """
+    st.fragment where available: widgets inside `func` rerun only `func`,
+    with the arguments of the last full run. Older Streamlit runs it inline.
+    """
+    return st.fragment(func) if hasattr(st, "fragment") else func
 
-if not df_kill_all.empty:
-    df_kill_all["ParsedTimestamp"] = df_kill_all["Timestamp"].apply(parse_iso_timestamp)
-else:
-    df_kill_all["ParsedTimestamp"] = pd.Series(dtype="datetime64[ns]")
+
+@contextmanager
+def lazy_panel(label, key, expanded=False):
+    """
+    st.expander that reruns when it is toggled and yields whether it is open,
+    so a collapsed panel skips its work. On Streamlit versions without
+    expander state tracking it always yields True.
+    """
+    if expanded:
+        st.session_state[key] = True
+    try:
+        box = st.expander(label, key=key, on_change="rerun")
+    except TypeError:
+        box = st.expander(label, expanded=expanded)
+    with box:
+        yield getattr(box, "open", None) is not False
+
+
+def panel_memo(name, inputs, compute=None):
+    """
+    Result of compute() for `inputs`, kept in session_state until the inputs
+    change. Without compute, the kept result if it is still current, else None.
+    """
+    memo = st.session_state.setdefault("panel_memo", {})
+    known = memo.get(name)
+    if known is not None and known[0] == inputs:
+        return known[1]
+    if compute is None:
+        return None
+    memo[name] = (inputs, compute())
+    return memo[name][1]
 
 # ---------------- Quick Stats Dashboard ----------------
 st.markdown("### 📊 Quick Statistics")
+if partial_entries:
+    st.caption("⏳ Partial results: these numbers grow until the background parse finishes")
 
 # Determine error severity and trigger audio alerts
-total_errors = len(combined_ora)
-total_warnings = len(combined_warnings)
-total_kills = len(combined_kill_sessions)
+total_errors = len(df_ora_all)
+total_warnings = len(df_warn_all)
+total_kills = len(df_kill_all)
 
-if AUDIO_ALERTS_ENABLED and total_errors > 0:
+if AUDIO_ALERTS_ENABLED and total_errors > 0 and not partial_entries:
     if total_errors > 100:
         play_audio_alert("critical")
         speak_text(f"Critical alert. {total_errors} errors detected")
@@ -850,7 +906,7 @@ if AUDIO_ALERTS_ENABLED and total_errors > 0:
 
 if mobile_view:
     # Mobile: Stack metrics vertically
-    st.metric("📄 Files Uploaded", len(uploaded_files))
+    st.metric("📄 Files Uploaded", len(uploaded_files) + len(followed_logs) + len(fleet_logs))
     st.metric("🔴 ORA Errors", total_errors)
     st.metric("🟡 Warnings", total_warnings)
     st.metric("⚡ Kill Sessions", total_kills)
@@ -860,7 +916,7 @@ else:
     # Desktop: Horizontal layout
     col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
-        st.metric("📄 Files Uploaded", len(uploaded_files))
+        st.metric("📄 Files Uploaded", len(uploaded_files) + len(followed_logs) + len(fleet_logs))
     with col2:
         st.metric("🔴 ORA Errors", total_errors)
     with col3:
@@ -894,9 +950,9 @@ with st.expander("🔍 Filters & Search", expanded=False):
     
     with tab1:
         today = date.today()
-        if not df_ora_all.empty and df_ora_all["ParsedTimestamp"].notna().any():
-            min_ts = df_ora_all["ParsedTimestamp"].min()
-            max_ts = df_ora_all["ParsedTimestamp"].max()
+        ora_bounds = time_bounds(df_ora_all)
+        if ora_bounds is not None:
+            min_ts, max_ts = ora_bounds
             default_start = min_ts.astimezone(LOCAL_TZ).date()
             default_end = max_ts.astimezone(LOCAL_TZ).date()
         else:
@@ -915,7 +971,13 @@ with st.expander("🔍 Filters & Search", expanded=False):
         st.info(f"📅 Filtering range: {global_start_dt} – {global_end_dt}")
     
     with tab2:
-        search_q = st.text_input("🔎 Search ORA code, error text, trace path, source, or any keyword", "").strip()
+        search_q = st.text_input("🔎 Search ORA code, error text, trace path, source, or any keyword", "",
+                                 help='Space-separated terms must all match; use OR for alternatives and "quotes" for phrases').strip()
+        search_regex = st.checkbox("Use regular expression", value=False, key="search_regex")
+        fulltext_search = st.checkbox("📜 Also search every raw log line (full-text index)", value=False,
+                                      key="fulltext_search", disabled=search_regex,
+                                      help="Builds a token index of each log once (kept with the parse cache), "
+                                           "then finds any tablespace, SQL_ID, PDB name... in the whole log")
         if search_q:
             st.info(f"🔎 Active search filter: **{search_q}**")
 
@@ -923,120 +985,130 @@ with st.expander("🔍 Filters & Search", expanded=False):
 def apply_global_date_filter(df, start_dt, end_dt):
     if df.empty or "ParsedTimestamp" not in df.columns:
         return df
-    df = df[df["ParsedTimestamp"].notna()].copy()
-    df = df[(df["ParsedTimestamp"] >= start_dt) & (df["ParsedTimestamp"] <= end_dt)]
-    return df
+    # Tables are time-sorted (NaT first), so this is a zero-copy slice
+    return time_window(df, start_dt, end_dt)
 
+df_ora_display, df_warn_display, df_kill_display = df_ora_all, df_warn_all, df_kill_all
 if search_q:
-    q = search_q.lower()
-    df_ora_display = df_ora_all[df_ora_all.apply(lambda r:
-        q in str(r.get("ORA Error","")).lower()
-        or q in str(r.get("Trace File","")).lower()
-        or q in str(r.get("Source","")).lower()
-    , axis=1)].copy()
-    df_warn_display = df_warn_all[df_warn_all.apply(lambda r:
-        q in str(r.get("Warning Message","")).lower()
-        or q in str(r.get("Trace File","")).lower()
-        or q in str(r.get("Source","")).lower()
-    , axis=1)].copy()
-    df_kill_display = df_kill_all[df_kill_all.apply(lambda r:
-        q in str(r.get("SID","")).lower()
-        or q in str(r.get("Serial#","")).lower()
-        or q in str(r.get("Reason","")).lower()
-        or q in str(r.get("Requestor","")).lower()
-        or q in str(r.get("Owner","")).lower()
-        or q in str(r.get("Source","")).lower()
-    , axis=1)].copy()
-else:
-    df_ora_display = df_ora_all.copy()
-    df_warn_display = df_warn_all.copy()
-    df_kill_display = df_kill_all.copy()
+    try:
+        df_ora_display = df_ora_all[search_mask(search_ora_all, search_q, regex=search_regex)]
+        df_warn_display = df_warn_all[search_mask(search_warn_all, search_q, regex=search_regex)]
+        df_kill_display = df_kill_all[search_mask(search_kill_all, search_q, regex=search_regex)]
+    except re.error as e:
+        st.error(f"⚠️ Invalid regular expression: {e}")
+        df_ora_display, df_warn_display, df_kill_display = df_ora_all, df_warn_all, df_kill_all
+        search_q = ""
 
 df_ora_display = apply_global_date_filter(df_ora_display, global_start_dt, global_end_dt)
 df_warn_display = apply_global_date_filter(df_warn_display, global_start_dt, global_end_dt)
 df_kill_display = apply_global_date_filter(df_kill_display, global_start_dt, global_end_dt)
+# Everything the filtered panels depend on; panel_memo() recomputes when it changes
+filter_key = (merge_key, search_q, search_regex, global_start_dt, global_end_dt)
 
 # ---- APPLY GLOBAL FILTERS TO INSTANCE EVENTS ----
-def filter_instance_events(event_list, search_q, start_dt, end_dt):
+def filter_instance_events(event_list, search_q, start_dt, end_dt, search_regex=False):
     """Filter instance-level events using global filters."""
     if not event_list:
         return pd.DataFrame(columns=["Timestamp", "Line"])
 
-    df = pd.DataFrame(event_list)
-    df["ParsedTimestamp"] = df["Timestamp"].apply(parse_iso_timestamp)
+    # Parsed and sorted once per merged event list (merged["info"] keeps the lists alive)
+    events = merged["events"]
+    if id(event_list) not in events:
+        events[id(event_list)] = events_frame(event_list)
+    df = events[id(event_list)]
 
     # Apply date filter
-    df = df[df["ParsedTimestamp"].notna()]
-    df = df[(df["ParsedTimestamp"] >= start_dt) &
-            (df["ParsedTimestamp"] <= end_dt)]
+    df = time_window(df, start_dt, end_dt)
 
     # Apply keyword search
     if search_q:
-        q = search_q.lower()
-        df = df[df["Line"].str.lower().str.contains(q)]
+        df = df[search_mask(df["Line"].str.lower(), search_q, regex=search_regex)]
 
     return df
 
+# ---------------- Fleet Overview ----------------
+if fleet_summary_df is not None:
+    with st.expander("🌐 Fleet Overview (per host / instance)", expanded=True):
+        if fleet_summary_df.empty:
+            st.info("🔭 No alert logs found under the fleet root")
+        else:
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("🖥️ Instances", len(fleet_summary_df))
+            with col2:
+                st.metric("💥 Instances with Crashes", int((fleet_summary_df["Crash Events"] > 0).sum()))
+            with col3:
+                st.metric("🔴 Fleet ORA Errors", int(fleet_summary_df["ORA Errors"].sum()))
+            st.dataframe(fleet_summary_df, use_container_width=True, hide_index=True)
+
 # ---------------- Instance Summary & Events ----------------
 expand_instance = st.session_state.get("voice_action") == "show_stats"
-with st.expander("🗂️ Instance Summary & Events", expanded=expand_instance):
-
-    # Build a clean list of raw lines from uploaded files (no wrapper markers)
-    clean_lines = []
-    for name, lines in per_file_lines.items():
-        clean_lines.extend(lines)
-
-    # Use the improved detector 
-    info = detect_instance_summary_and_events(clean_lines)
-
-    st.markdown("#### 🖥️ Instance Information")
-    cols = st.columns(3)
-    with cols[0]:
-        st.info(f"**Instance Names**\n\n{', '.join(info['Instance Names']) or 'N/A'}")
-    with cols[1]:
-        st.info(f"**Hostnames**\n\n{', '.join(info['Hostnames']) or 'N/A'}")
-    with cols[2]:
-        st.info(f"**Oracle Releases**\n\n{', '.join(info['Oracle Releases']) or 'N/A'}")
-
-    # ---------------- Startup Events ----------------
-    st.markdown("#### 🚀 Startup Events")
-    df = filter_instance_events(info["Startup Events"], search_q, global_start_dt, global_end_dt)
-    if not df.empty:
-        st.dataframe(df[["Timestamp", "Line"]], use_container_width=True)
-    else:
-        st.success("✅ No startup events in selected filters")
+@fragment
+def instance_summary_panel(merged, filter_key, search_q, search_regex, global_start_dt, global_end_dt, expand_instance):
+    """Instance info and lifecycle events within the global filters."""
+    with lazy_panel("🗂️ Instance Summary & Events", "instance_panel", expanded=expand_instance) as panel_open:
+        if panel_open:
+
+            # Per-file detector results come from the parse cache, merged with the tables
+            info = merged["info"]
+
+            st.markdown("#### 🖥️ Instance Information")
+            cols = st.columns(3)
+            with cols[0]:
+                st.info(f"**Instance Names**\n\n{', '.join(info['Instance Names']) or 'N/A'}")
+            with cols[1]:
+                st.info(f"**Hostnames**\n\n{', '.join(info['Hostnames']) or 'N/A'}")
+            with cols[2]:
+                st.info(f"**Oracle Releases**\n\n{', '.join(info['Oracle Releases']) or 'N/A'}")
+
+            # Filtered once per filter change instead of on every rerun
+            instance_events = panel_memo("instance_events", filter_key, lambda: {
+                kind: filter_instance_events(info[kind], search_q, global_start_dt, global_end_dt, search_regex)
+                for kind in ("Startup Events", "Shutdown Events", "Alter Commands", "Resize Commands", "Crash Events")
+            })
 
-    # ---------------- Shutdown Events ----------------
-    st.markdown("#### 🔻 Shutdown Events")
-    df = filter_instance_events(info["Shutdown Events"], search_q, global_start_dt, global_end_dt)
-    if not df.empty:
-        st.dataframe(df[["Timestamp", "Line"]], use_container_width=True)
-    else:
-        st.success("✅ No shutdown events in selected filters")
+            # ---------------- Startup Events ----------------
+            st.markdown("#### 🚀 Startup Events")
+            df = instance_events["Startup Events"]
+            if not df.empty:
+                st.dataframe(df[["Timestamp", "Line"]], use_container_width=True)
+            else:
+                st.success("✅ No startup events in selected filters")
 
-    # ---------------- ALTER Command Events ----------------
-    st.markdown("#### 📝 ALTER Command Events")
-    df = filter_instance_events(info["Alter Commands"], search_q, global_start_dt, global_end_dt)
-    if not df.empty:
-        st.dataframe(df[["Timestamp", "Line"]], use_container_width=True)
-    else:
-        st.success("✅ No ALTER commands in selected filters")
+            # ---------------- Shutdown Events ----------------
+            st.markdown("#### 🔻 Shutdown Events")
+            df = instance_events["Shutdown Events"]
+            if not df.empty:
+                st.dataframe(df[["Timestamp", "Line"]], use_container_width=True)
+            else:
+                st.success("✅ No shutdown events in selected filters")
 
-    # ---------------- Resize Commands ----------------
-    st.markdown("#### 📏 Resize Commands")
-    df = filter_instance_events(info["Resize Commands"], search_q, global_start_dt, global_end_dt)
-    if not df.empty:
-        st.dataframe(df[["Timestamp", "Line"]], use_container_width=True)
-    else:
-        st.success("✅ No resize commands in selected filters")
+            # ---------------- ALTER Command Events ----------------
+            st.markdown("#### 📝 ALTER Command Events")
+            df = instance_events["Alter Commands"]
+            if not df.empty:
+                st.dataframe(df[["Timestamp", "Line"]], use_container_width=True)
+            else:
+                st.success("✅ No ALTER commands in selected filters")
 
-    # ---------------- Crash / Termination Events ----------------
-    st.markdown("#### 💥 Crash / Termination Events")
-    df = filter_instance_events(info["Crash Events"], search_q, global_start_dt, global_end_dt)
-    if not df.empty:
-        st.dataframe(df[["Timestamp", "Line"]], use_container_width=True)
-    else:
-        st.success("🎉 No crash or abnormal termination events in selected filters")
+            # ---------------- Resize Commands ----------------
+            st.markdown("#### 📏 Resize Commands")
+            df = instance_events["Resize Commands"]
+            if not df.empty:
+                st.dataframe(df[["Timestamp", "Line"]], use_container_width=True)
+            else:
+                st.success("✅ No resize commands in selected filters")
+
+            # ---------------- Crash / Termination Events ----------------
+            st.markdown("#### 💥 Crash / Termination Events")
+            df = instance_events["Crash Events"]
+            if not df.empty:
+                st.dataframe(df[["Timestamp", "Line"]], use_container_width=True)
+            else:
+                st.success("🎉 No crash or abnormal termination events in selected filters")
+
+
+instance_summary_panel(merged, filter_key, search_q, search_regex, global_start_dt, global_end_dt, expand_instance)
 
 
 
@@ -1044,432 +1116,502 @@ with st.expander("🗂️ Instance Summary & Events", expanded=expand_instance):
 expand_errors_tab = st.session_state.get("voice_action") == "show_errors"
 expand_warnings_tab = st.session_state.get("voice_action") == "show_warnings"
 
-# If either tab should be expanded, show that one
-if expand_errors_tab or expand_warnings_tab:
-    tab_ora, tab_warn = st.tabs(["🔴 ORA Errors", "🟡 Warnings"])
+@fragment
+def error_tables_panel(df_ora_display, df_warn_display, filter_key, expand_errors_tab, expand_warnings_tab):
+    """Filtered ORA error and warning tables with their counts."""
+    # If either tab should be expanded, show that one
+    if expand_errors_tab or expand_warnings_tab:
+        tab_ora, tab_warn = st.tabs(["🔴 ORA Errors", "🟡 Warnings"])
     
-    with tab_ora:
-        with st.expander("📋 ORA Error Details", expanded=expand_errors_tab):
-            if not df_ora_display.empty:
-                st.dataframe(df_ora_display.drop(columns=["ParsedTimestamp"], errors="ignore"), use_container_width=True)
+        with tab_ora:
+            with st.expander("📋 ORA Error Details", expanded=expand_errors_tab):
+                if not df_ora_display.empty:
+                    st.dataframe(df_ora_display.drop(columns=["ParsedTimestamp"], errors="ignore"), use_container_width=True)
                 
-                st.markdown("#### 📊 Error Distribution")
-                counts = df_ora_display["ORA Error"].value_counts().reset_index()
-                counts.columns = ["ORA Error", "Count"]
-                st.dataframe(counts, use_container_width=True)
-            else:
-                st.info("✅ No ORA errors found in selected range/search")
+                    st.markdown("#### 📊 Error Distribution")
+                    counts = panel_memo("ora_counts", filter_key, lambda: observed_counts(df_ora_display["ORA Error"]).reset_index())
+                    counts.columns = ["ORA Error", "Count"]
+                    st.dataframe(counts, use_container_width=True)
+                else:
+                    st.info("✅ No ORA errors found in selected range/search")
     
-    with tab_warn:
-        with st.expander("📋 Warning Details", expanded=expand_warnings_tab):
-            if not df_warn_display.empty:
-                st.dataframe(df_warn_display.drop(columns=["ParsedTimestamp"], errors="ignore"), use_container_width=True)
+        with tab_warn:
+            with st.expander("📋 Warning Details", expanded=expand_warnings_tab):
+                if not df_warn_display.empty:
+                    st.dataframe(df_warn_display.drop(columns=["ParsedTimestamp"], errors="ignore"), use_container_width=True)
                 
-                st.markdown("#### 📊 Top Warnings")
-                top_w = df_warn_display["Warning Message"].value_counts().head(20).reset_index()
-                top_w.columns = ["Warning Message", "Count"]
-                st.dataframe(top_w, use_container_width=True)
-            else:
-                st.info("✅ No warnings found in selected range/search")
-else:
-    # Normal tabs without forced expansion
-    tab_ora, tab_warn = st.tabs(["🔴 ORA Errors", "🟡 Warnings"])
+                    st.markdown("#### 📊 Top Warnings")
+                    top_w = panel_memo("top_warnings", filter_key,
+                                       lambda: observed_counts(df_warn_display["Warning Message"]).head(20).reset_index())
+                    top_w.columns = ["Warning Message", "Count"]
+                    st.dataframe(top_w, use_container_width=True)
+                else:
+                    st.info("✅ No warnings found in selected range/search")
+    else:
+        # Normal tabs without forced expansion
+        tab_ora, tab_warn = st.tabs(["🔴 ORA Errors", "🟡 Warnings"])
     
-    with tab_ora:
-        with st.expander("📋 ORA Error Details", expanded=True):
-            if not df_ora_display.empty:
-                st.dataframe(df_ora_display.drop(columns=["ParsedTimestamp"], errors="ignore"), use_container_width=True)
+        with tab_ora:
+            with st.expander("📋 ORA Error Details", expanded=True):
+                if not df_ora_display.empty:
+                    st.dataframe(df_ora_display.drop(columns=["ParsedTimestamp"], errors="ignore"), use_container_width=True)
                 
-                st.markdown("#### 📊 Error Distribution")
-                counts = df_ora_display["ORA Error"].value_counts().reset_index()
-                counts.columns = ["ORA Error", "Count"]
-                st.dataframe(counts, use_container_width=True)
-            else:
-                st.info("✅ No ORA errors found in selected range/search")
+                    st.markdown("#### 📊 Error Distribution")
+                    counts = panel_memo("ora_counts", filter_key, lambda: observed_counts(df_ora_display["ORA Error"]).reset_index())
+                    counts.columns = ["ORA Error", "Count"]
+                    st.dataframe(counts, use_container_width=True)
+                else:
+                    st.info("✅ No ORA errors found in selected range/search")
     
-    with tab_warn:
-        with st.expander("📋 Warning Details", expanded=True):
-            if not df_warn_display.empty:
-                st.dataframe(df_warn_display.drop(columns=["ParsedTimestamp"], errors="ignore"), use_container_width=True)
+        with tab_warn:
+            with st.expander("📋 Warning Details", expanded=True):
+                if not df_warn_display.empty:
+                    st.dataframe(df_warn_display.drop(columns=["ParsedTimestamp"], errors="ignore"), use_container_width=True)
                 
-                st.markdown("#### 📊 Top Warnings")
-                top_w = df_warn_display["Warning Message"].value_counts().head(20).reset_index()
-                top_w.columns = ["Warning Message", "Count"]
-                st.dataframe(top_w, use_container_width=True)
+                    st.markdown("#### 📊 Top Warnings")
+                    top_w = panel_memo("top_warnings", filter_key,
+                                       lambda: observed_counts(df_warn_display["Warning Message"]).head(20).reset_index())
+                    top_w.columns = ["Warning Message", "Count"]
+                    st.dataframe(top_w, use_container_width=True)
+                else:
+                    st.info("✅ No warnings found in selected range/search")
+
+
+error_tables_panel(df_ora_display, df_warn_display, filter_key, expand_errors_tab, expand_warnings_tab)
+
+# ---------------- Raw Line Search (full-text index) ----------------
+@fragment
+def raw_line_search_panel(fulltext_search, search_q, search_regex, per_file_entries, per_file_lines, upload_keys, fleet_logs):
+    """Full-text matches over every raw line; picking a match only reruns this panel."""
+    if fulltext_search and search_q and not search_regex:
+        with st.expander("📜 Raw Log Line Matches", expanded=True):
+            # name -> (entry, TextIndex); rebuilt only when that log's parse result changes
+            text_indexes = st.session_state.setdefault("text_indexes", {})
+            index_keys = {name: cache_key for _, name, cache_key in upload_keys}
+            for name, path, _ in fleet_logs:
+                try:
+                    index_keys[name] = disk_parse_cache.file_key(path, name)
+                except OSError:
+                    pass
+            matches = []
+            for name, entry in per_file_entries.items():
+                known = text_indexes.get(name)
+                if known is None or known[0] is not entry:
+                    key = index_keys.get(name)  # followed logs keep changing, so only their in-memory index is reused
+                    index = disk_parse_cache.get_text_index(key) if key else None
+                    if index is None:
+                        with st.spinner(f"📜 Indexing {name}..."):
+                            index = TextIndex.build(per_file_lines.source(name))
+                        if key:
+                            disk_parse_cache.put_text_index(key, index)
+                    text_indexes[name] = (entry, index)
+                source = per_file_lines.source(name)
+                for line_index, offset, line in text_indexes[name][1].search(source, search_q, limit=TEXT_SEARCH_MAX_HITS - len(matches)):
+                    matches.append((name, line_index + 1, offset, line))
+                if len(matches) >= TEXT_SEARCH_MAX_HITS:
+                    st.warning(f"⚠️ Showing the first {TEXT_SEARCH_MAX_HITS} matching lines")
+                    break
+            for name in set(text_indexes) - set(per_file_entries):
+                del text_indexes[name]
+
+            if not matches:
+                st.info(f"🔭 No raw log line contains **{search_q}**")
             else:
-                st.info("✅ No warnings found in selected range/search")
-
-# ---------------- Error Frequency Chart ----------------
-with st.expander("📈 ORA Error Frequency Chart", expanded=False):
-    if df_ora_all.empty or df_ora_all["ParsedTimestamp"].isna().all():
-        st.info("No timestamped ORA data available to plot")
-    else:
-        log_col = None
-        if "AlertLogName" in df_ora_all.columns:
-            log_col = "AlertLogName"
-        elif "Filename" in df_ora_all.columns:
-            log_col = "Filename"
-        elif "Source" in df_ora_all.columns:
-            log_col = "Source"
-
-        if log_col is None:
-            df_ora_all["__AlertLogGroup__"] = "All Logs Combined"
-            log_col = "__AlertLogGroup__"
-
-        log_list = sorted(df_ora_all[log_col].dropna().unique())
-
-        if len(log_list) > 1:
-            selected_log = st.selectbox("📂 Select Alert Log", log_list, key="selected_alert_log")
-            df_selected = df_ora_all[df_ora_all[log_col] == selected_log].copy()
-        else:
-            selected_log = log_list[0]
-            st.info(f"📂 Showing: **{selected_log}**")
-            df_selected = df_ora_all.copy()
-
-        if df_selected.empty:
-            st.warning("No ORA errors found in the selected alert log")
-        else:
-            overall_min = df_selected["ParsedTimestamp"].min()
-            overall_max = df_selected["ParsedTimestamp"].max()
-
-            col1, col2, col3 = st.columns([2, 2, 1])
-            with col1:
-                chart_start_date = st.date_input("Chart start date",
-                                                 overall_min.astimezone(LOCAL_TZ).date(),
-                                                 key="chart_start_date")
-                chart_start_time = st.time_input("Chart start time",
-                                                 overall_min.astimezone(LOCAL_TZ).time(),
-                                                 key="chart_start_time")
-            with col2:
-                chart_end_date = st.date_input("Chart end date",
-                                               overall_max.astimezone(LOCAL_TZ).date(),
-                                               key="chart_end_date")
-                chart_end_time = st.time_input("Chart end time",
-                                               overall_max.astimezone(LOCAL_TZ).time(),
-                                               key="chart_end_time")
-            with col3:
-                view_mode = st.radio("Granularity", ["Hourly", "Daily"], key="chart_view")
+                df_matches = pd.DataFrame(matches, columns=["Source", "Line", "Byte Offset", "Text"])
+                st.dataframe(df_matches.drop(columns=["Byte Offset"]), use_container_width=True, hide_index=True)
+                picked = st.selectbox(
+                    "Show context for",
+                    range(len(matches)),
+                    format_func=lambda i: f"{matches[i][0]}:{matches[i][1]}  {matches[i][3][:80]}",
+                    key="fulltext_context_pick",
+                )
+                name, _, offset, _ = matches[picked]
+                st.code("\n".join(read_context(per_file_lines.source(name), offset, before=5, after=5)), language="text")
 
-            chart_start_dt = datetime.combine(chart_start_date, chart_start_time).replace(tzinfo=LOCAL_TZ)
-            chart_end_dt = datetime.combine(chart_end_date, chart_end_time).replace(tzinfo=LOCAL_TZ)
 
-            df_chart_base = df_selected[df_selected["ParsedTimestamp"].notna()].copy()
-            df_chart_base = df_chart_base[
-                (df_chart_base["ParsedTimestamp"] >= chart_start_dt)
-                & (df_chart_base["ParsedTimestamp"] <= chart_end_dt)
-            ]
+raw_line_search_panel(fulltext_search, search_q, search_regex, per_file_entries, per_file_lines, upload_keys, fleet_logs)
 
-            if df_chart_base.empty:
-                st.warning("No ORA errors in the selected chart time window")
+# ---------------- Error Frequency Chart ----------------
+@fragment
+def frequency_chart_panel(df_ora_all, merge_key):
+    """Per-ORA frequency chart; its log, window and granularity widgets only rerun this panel."""
+    with lazy_panel("📈 ORA Error Frequency Chart", "frequency_chart_panel") as panel_open:
+        if panel_open:
+            if df_ora_all.empty or df_ora_all["ParsedTimestamp"].isna().all():
+                st.info("No timestamped ORA data available to plot")
             else:
-                if view_mode == "Hourly":
-                    df_chart_base["TimeBucket"] = df_chart_base["ParsedTimestamp"].dt.floor("H")
-                    df_chart_base["MinuteStr"] = df_chart_base["ParsedTimestamp"].dt.strftime("%Y-%m-%d %H:%M")
+                log_col = None
+                if "AlertLogName" in df_ora_all.columns:
+                    log_col = "AlertLogName"
+                elif "Filename" in df_ora_all.columns:
+                    log_col = "Filename"
+                elif "Source" in df_ora_all.columns:
+                    log_col = "Source"
+
+                if log_col is None:
+                    df_ora_all["__AlertLogGroup__"] = "All Logs Combined"
+                    log_col = "__AlertLogGroup__"
+
+                log_list = panel_memo("chart_logs", merge_key, lambda: sorted(df_ora_all[log_col].dropna().unique()))
+
+                if len(log_list) > 1:
+                    selected_log = st.selectbox("📂 Select Alert Log", log_list, key="selected_alert_log")
+                    df_selected = panel_memo("chart_selected", (merge_key, selected_log),
+                                             lambda: df_ora_all[df_ora_all[log_col] == selected_log])
                 else:
-                    df_chart_base["TimeBucket"] = df_chart_base["ParsedTimestamp"].dt.floor("D")
-                    df_chart_base["MinuteStr"] = df_chart_base["ParsedTimestamp"].dt.strftime("%Y-%m-%d")
-
-                freq = df_chart_base.groupby(["TimeBucket", "ORA Error"]).size().reset_index(name="Count")
-
-                if view_mode == "Hourly":
-                    sample_minutes = df_chart_base.groupby(["TimeBucket", "ORA Error"])["MinuteStr"].agg(
-                        lambda s: ", ".join(sorted(set(s))[:6])
-                    ).reset_index(name="SampleMinutes")
-                    freq = freq.merge(sample_minutes, on=["TimeBucket", "ORA Error"], how="left")
+                    selected_log = log_list[0]
+                    st.info(f"📂 Showing: **{selected_log}**")
+                    df_selected = df_ora_all
+
+                if df_selected.empty:
+                    st.warning("No ORA errors found in the selected alert log")
+                elif time_bounds(df_selected) is None:
+                    st.info("No timestamped ORA errors in the selected alert log")
                 else:
-                    freq["SampleMinutes"] = freq["TimeBucket"].dt.strftime("%Y-%m-%d")
-
-                import plotly.graph_objects as go
-                x_vals = sorted(freq["TimeBucket"].unique())
-                ora_codes = sorted(freq["ORA Error"].unique())
-
-                fig = go.Figure()
-                colors = [
-                    '#667eea', '#764ba2', '#f093fb', '#f5576c',
-                    '#4facfe', '#00f2fe', '#43e97b', '#38f9d7'
-                ]
-
-                for idx, ora in enumerate(ora_codes):
-                    sub = freq[freq["ORA Error"] == ora].set_index("TimeBucket").reindex(
-                        x_vals, fill_value=0
-                    ).reset_index()
-
-                    sample_map = dict(zip(sub["TimeBucket"], sub["SampleMinutes"]))
-
-                    hover_text = [
-                        f"<b>Time:</b> {x}<br>"
-                        f"<b>ORA:</b> {ora}<br>"
-                        f"<b>Count:</b> {int(cnt)}<br>"
-                        f"<b>Sample:</b> {sample_map.get(x, '')}"
-                        for x, cnt in zip(sub["TimeBucket"], sub["Count"])
-                    ]
-
-                    fig.add_trace(go.Bar(
-                        x=sub["TimeBucket"],
-                        y=sub["Count"],
-                        name=ora,
-                        text=sub["Count"],
-                        textposition="outside",
-                        hovertext=hover_text,
-                        hoverinfo="text",
-                        marker_color=colors[idx % len(colors)]
-                    ))
+                    overall_min, overall_max = time_bounds(df_selected)
+
+                    col1, col2, col3 = st.columns([2, 2, 1])
+                    with col1:
+                        chart_start_date = st.date_input("Chart start date",
+                                                         overall_min.astimezone(LOCAL_TZ).date(),
+                                                         key="chart_start_date")
+                        chart_start_time = st.time_input("Chart start time",
+                                                         overall_min.astimezone(LOCAL_TZ).time(),
+                                                         key="chart_start_time")
+                    with col2:
+                        chart_end_date = st.date_input("Chart end date",
+                                                       overall_max.astimezone(LOCAL_TZ).date(),
+                                                       key="chart_end_date")
+                        chart_end_time = st.time_input("Chart end time",
+                                                       overall_max.astimezone(LOCAL_TZ).time(),
+                                                       key="chart_end_time")
+                    with col3:
+                        view_mode = st.radio("Granularity", ["Hourly", "Daily"], key="chart_view")
+
+                    chart_start_dt = datetime.combine(chart_start_date, chart_start_time).replace(tzinfo=LOCAL_TZ)
+                    chart_end_dt = datetime.combine(chart_end_date, chart_end_time).replace(tzinfo=LOCAL_TZ)
+
+                    def build_frequency_figure():
+                        df_chart_base = time_window(df_selected, chart_start_dt, chart_end_dt)
+
+                        if df_chart_base.empty:
+                            return None
+
+                        freq = error_frequency(df_chart_base, hourly=view_mode == "Hourly")
+
+                        import plotly.graph_objects as go
+                        ora_codes = sorted(freq["ORA Error"].unique())
+
+                        fig = go.Figure()
+                        colors = [
+                            '#667eea', '#764ba2', '#f093fb', '#f5576c',
+                            '#4facfe', '#00f2fe', '#43e97b', '#38f9d7'
+                        ]
+
+                        for idx, ora in enumerate(ora_codes):
+                            sub = freq[freq["ORA Error"] == ora]
+
+                            sample_map = dict(zip(sub["TimeBucket"], sub["SampleMinutes"]))
+
+                            hover_text = [
+                                f"<b>Time:</b> {x}<br>"
+                                f"<b>ORA:</b> {ora}<br>"
+                                f"<b>Count:</b> {int(cnt)}<br>"
+                                f"<b>Sample:</b> {sample_map.get(x, '')}"
+                                for x, cnt in zip(sub["TimeBucket"], sub["Count"])
+                            ]
+
+                            fig.add_trace(go.Bar(
+                                x=sub["TimeBucket"],
+                                y=sub["Count"],
+                                name=ora,
+                                text=sub["Count"],
+                                textposition="outside",
+                                hovertext=hover_text,
+                                hoverinfo="text",
+                                marker_color=colors[idx % len(colors)]
+                            ))
+
+                        x_label = "Hour" if view_mode == "Hourly" else "Date"
+
+                        fig.update_layout(
+                            barmode="group",
+                            bargap=0.30,
+                            bargroupgap=0.05,
+                            title=f"ORA Error Frequency ({view_mode}) – {selected_log}",
+                            xaxis=dict(
+                                title=x_label,
+                                tickangle=0,
+                                type="category",
+                                tickfont=dict(size=11),
+                                showgrid=True,
+                                gridcolor='rgba(0,0,0,0.05)',
+                            ),
+                            yaxis=dict(
+                                title="Occurrences (Log Scale)",
+                                type="log",
+                                dtick=1,
+                                showgrid=True,
+                                gridcolor='rgba(0,0,0,0.15)',
+                            ),
+                            legend_title_text="ORA Error",
+                            height=600,
+                            margin=dict(l=30, r=30, t=60, b=120),
+                            plot_bgcolor="white",
+                            paper_bgcolor="white",
+                            font=dict(family="Arial, sans-serif", size=12, color="#333"),
+                        )
+                        return fig
+
+                    # Rebuilt only when the log, window or granularity changes
+                    fig = panel_memo("frequency_chart", (merge_key, selected_log, chart_start_dt, chart_end_dt, view_mode),
+                                     build_frequency_figure)
+                    if fig is None:
+                        st.warning("No ORA errors in the selected chart time window")
+                    else:
+                        st.plotly_chart(fig, use_container_width=True)
 
-                x_label = "Hour" if view_mode == "Hourly" else "Date"
-
-                fig.update_layout(
-                    barmode="group",
-                    bargap=0.30,
-                    bargroupgap=0.05,
-                    title=f"ORA Error Frequency ({view_mode}) – {selected_log}",
-                    xaxis=dict(
-                        title=x_label,
-                        tickangle=0,
-                        type="category",
-                        tickfont=dict(size=11),
-                        showgrid=True,
-                        gridcolor='rgba(0,0,0,0.05)',
-                    ),
-                    yaxis=dict(
-                        title="Occurrences (Log Scale)",
-                        type="log",
-                        dtick=1,
-                        showgrid=True,
-                        gridcolor='rgba(0,0,0,0.15)',
-                    ),
-                    legend_title_text="ORA Error",
-                    height=600,
-                    margin=dict(l=30, r=30, t=60, b=120),
-                    plot_bgcolor="white",
-                    paper_bgcolor="white",
-                    font=dict(family="Arial, sans-serif", size=12, color="#333"),
-                )
 
-                st.plotly_chart(fig, use_container_width=True)
+frequency_chart_panel(df_ora_all, merge_key)
 
 # ---------------- Kill Session Events ----------------
 expand_kills = st.session_state.get("voice_action") == "show_kills"
-with st.expander("⚡ Kill Session Events", expanded=expand_kills):
-    if df_kill_all.empty:
-        st.success("✅ No kill session events detected")
-    else:
-        st.markdown(f"""
-        <div style='background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); 
-                    padding: 1.5rem; border-radius: 8px; color: white; margin-bottom: 1rem;'>
-            <h4 style='margin: 0 0 0.5rem 0;'>⚡ Session Termination Analysis</h4>
-            <p style='margin: 0; opacity: 0.9;'>Total Kill Session Events: <strong>{len(df_kill_display)}</strong></p>
-        </div>
-        """, unsafe_allow_html=True)
+@fragment
+def kill_sessions_panel(df_kill_all, df_kill_display, filter_key, expand_kills):
+    """Kill-session statistics and details within the global filters."""
+    with lazy_panel("⚡ Kill Session Events", "kill_sessions_panel", expanded=expand_kills) as panel_open:
+        if panel_open:
+            if df_kill_all.empty:
+                st.success("✅ No kill session events detected")
+            else:
+                st.markdown(f"""
+                <div style='background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); 
+                            padding: 1.5rem; border-radius: 8px; color: white; margin-bottom: 1rem;'>
+                    <h4 style='margin: 0 0 0.5rem 0;'>⚡ Session Termination Analysis</h4>
+                    <p style='margin: 0; opacity: 0.9;'>Total Kill Session Events: <strong>{len(df_kill_display)}</strong></p>
+                </div>
+                """, unsafe_allow_html=True)
         
-        if not df_kill_display.empty:
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                unique_sids = df_kill_display["SID"].nunique()
-                st.metric("🎯 Unique SIDs Killed", unique_sids)
-            with col2:
-                kill_modes = df_kill_display["Mode"].value_counts()
-                most_common_mode = kill_modes.index[0] if not kill_modes.empty else "N/A"
-                st.metric("🔧 Most Common Mode", most_common_mode)
-            with col3:
-                kill_reasons = df_kill_display["Reason"].value_counts()
-                most_common_reason = kill_reasons.index[0] if not kill_reasons.empty else "N/A"
-                display_reason = str(most_common_reason)[:30] + "..." if len(str(most_common_reason)) > 30 else str(most_common_reason)
-                st.metric("📋 Most Common Reason", display_reason)
+                if not df_kill_display.empty:
+                    col1, col2, col3 = st.columns(3)
+                    unique_sids, kill_modes, kill_reasons = panel_memo("kill_stats", filter_key, lambda: (
+                        df_kill_display["SID"].nunique(),
+                        observed_counts(df_kill_display["Mode"]),
+                        observed_counts(df_kill_display["Reason"]),
+                    ))
+                    with col1:
+                        st.metric("🎯 Unique SIDs Killed", unique_sids)
+                    with col2:
+                        most_common_mode = kill_modes.index[0] if not kill_modes.empty else "N/A"
+                        st.metric("🔧 Most Common Mode", most_common_mode)
+                    with col3:
+                        most_common_reason = kill_reasons.index[0] if not kill_reasons.empty else "N/A"
+                        display_reason = str(most_common_reason)[:30] + "..." if len(str(most_common_reason)) > 30 else str(most_common_reason)
+                        st.metric("📋 Most Common Reason", display_reason)
             
-            st.markdown("---")
-            st.markdown("#### 📋 Kill Session Details")
-            display_cols = ["Timestamp", "SID", "Serial#", "Reason", "Mode", "Requestor", "Owner", "Source"]
-            st.dataframe(df_kill_display[display_cols], use_container_width=True, height=400)
-        else:
-            st.info("🔍 No kill session events found in the selected time range/search criteria")
+                    st.markdown("---")
+                    st.markdown("#### 📋 Kill Session Details")
+                    display_cols = ["Timestamp", "SID", "Serial#", "Reason", "Mode", "Requestor", "Owner", "Source"]
+                    st.dataframe(df_kill_display[display_cols], use_container_width=True, height=400)
+                else:
+                    st.info("🔍 No kill session events found in the selected time range/search criteria")
 
-# ---------------- Compare Two Logs ----------------
-with st.expander("🔄 Compare Two Uploaded Logs", expanded=False):
-    file_names = list(per_file_lines.keys())
-    if len(file_names) < 2:
-        st.info("📤 Upload at least two files to compare")
-    else:
-        col1, col2 = st.columns(2)
-        with col1:
-            file_a = st.selectbox("📄 File A (baseline)", file_names, index=0)
-        with col2:
-            file_b = st.selectbox("📄 File B (compare)", file_names, index=1 if len(file_names) > 1 else 0)
 
-        if st.button("🔍 Run Compare", use_container_width=True):
-            with st.spinner("Comparing logs..."):
-                ora_a, warn_a, kill_a = analyze_alert_log_lines(per_file_lines[file_a], source_name=file_a)
-                ora_b, warn_b, kill_b = analyze_alert_log_lines(per_file_lines[file_b], source_name=file_b)
-                comp = compare_two_parsed_lists(ora_a, ora_b)
+kill_sessions_panel(df_kill_all, df_kill_display, filter_key, expand_kills)
+
+# ---------------- Compare Two Logs ----------------
+@fragment
+def compare_panel(per_file_lines, per_file_entries):
+    """Side-by-side ORA comparison of two logs."""
+    with lazy_panel("🔄 Compare Two Uploaded Logs", "compare_panel") as panel_open:
+        if panel_open:
+            file_names = list(per_file_lines.keys())
+            if len(file_names) < 2:
+                st.info("📤 Upload at least two files to compare")
+            else:
+                col1, col2 = st.columns(2)
+                with col1:
+                    file_a = st.selectbox("📄 File A (baseline)", file_names, index=0)
+                with col2:
+                    file_b = st.selectbox("📄 File B (compare)", file_names, index=1 if len(file_names) > 1 else 0)
+
+                if st.button("🔍 Run Compare", use_container_width=True):
+                    with st.spinner("Comparing logs..."):
+                        # Reuse the parsed tables instead of re-scanning both files
+                        comp = compare_two_parsed_lists(per_file_entries[file_a]["df_ora"], per_file_entries[file_b]["df_ora"])
             
-            st.markdown("#### 📊 Counts by ORA Error (A vs B)")
-            st.dataframe(comp["counts"], use_container_width=True)
+                    st.markdown("#### 📊 Counts by ORA Error (A vs B)")
+                    st.dataframe(comp["counts"], use_container_width=True)
+
+                    if not comp["buckets"].empty:
+                        st.markdown("#### ⏱️ Hourly Delta (B − A)")
+                        import plotly.graph_objects as go
+                        buckets = comp["buckets"]
+                        fig_delta = go.Figure(go.Bar(
+                            x=buckets["Time Bucket"],
+                            y=buckets["Delta"],
+                            customdata=buckets[["Count_A", "Count_B"]],
+                            hovertemplate="<b>Time:</b> %{x}<br><b>A:</b> %{customdata[0]}<br>"
+                                          "<b>B:</b> %{customdata[1]}<br><b>Delta:</b> %{y}<extra></extra>",
+                            marker_color=['#f5576c' if d > 0 else '#43e97b' for d in buckets["Delta"]],
+                        ))
+                        fig_delta.update_layout(height=350, margin=dict(l=30, r=30, t=30, b=60),
+                                                plot_bgcolor="white", paper_bgcolor="white")
+                        st.plotly_chart(fig_delta, use_container_width=True)
             
-            col1, col2 = st.columns(2)
-            with col1:
-                st.markdown("#### ➕ New in B (not in A)")
-                if comp["new_in_b"]:
-                    st.dataframe(pd.DataFrame(comp["new_in_b"]), use_container_width=True)
-                else:
-                    st.success("✅ No new ORA entries in B")
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        st.markdown("#### ➕ New in B (not in A)")
+                        if not comp["new_in_b"].empty:
+                            st.dataframe(comp["new_in_b"], use_container_width=True)
+                        else:
+                            st.success("✅ No new ORA entries in B")
             
-            with col2:
-                st.markdown("#### ➖ Only in A (missing in B)")
-                if comp["new_in_a"]:
-                    st.dataframe(pd.DataFrame(comp["new_in_a"]), use_container_width=True)
-                else:
-                    st.success("✅ No unique entries in A")
+                    with col2:
+                        st.markdown("#### ➖ Only in A (missing in B)")
+                        if not comp["new_in_a"].empty:
+                            st.dataframe(comp["new_in_a"], use_container_width=True)
+                        else:
+                            st.success("✅ No unique entries in A")
+
+
+compare_panel(per_file_lines, per_file_entries)
 
 # ---------------- Mistral AI Analysis ----------------
 expand_ai = st.session_state.get("voice_action") == "show_ai"
-with st.expander("🤖 Mistral AI Analysis (Oracle Performance Expert)", expanded=expand_ai):
-    st.markdown("""
-    <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-                padding: 1.5rem; border-radius: 8px; color: white; margin-bottom: 1rem;'>
-        <h4 style='margin: 0 0 0.5rem 0;'>🧠 AI-Powered Analysis</h4>
-        <p style='margin: 0; opacity: 0.9;'>Get expert insights from Mistral AI about your Oracle alert logs</p>
-    </div>
-    """, unsafe_allow_html=True)
+@fragment
+def ai_analysis_panel(per_file_lines, df_ora_display, df_warn_display, expand_ai):
+    """Mistral AI analysis of one log's filtered segment."""
+    with lazy_panel("🤖 Mistral AI Analysis (Oracle Performance Expert)", "ai_panel", expanded=expand_ai) as panel_open:
+        if panel_open:
+            st.markdown("""
+            <div style='background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
+                        padding: 1.5rem; border-radius: 8px; color: white; margin-bottom: 1rem;'>
+                <h4 style='margin: 0 0 0.5rem 0;'>🧠 AI-Powered Analysis</h4>
+                <p style='margin: 0; opacity: 0.9;'>Get expert insights from Mistral AI about your Oracle alert logs</p>
+            </div>
+            """, unsafe_allow_html=True)
     
-    user_prompt = st.text_area("💬 Your instruction:", 
-                               "Analyze logs between 18:00 and 19:00 on 2025-10-14 for performance issues",
-                               height=120)
-    use_filtered_segment = st.checkbox("🎯 Use currently filtered segment for AI analysis", value=True)
+            user_prompt = st.text_area("💬 Your instruction:", 
+                                       "Analyze logs between 18:00 and 19:00 on 2025-10-14 for performance issues",
+                                       height=120)
+            use_filtered_segment = st.checkbox("🎯 Use currently filtered segment for AI analysis", value=True)
 
-    logs = {name: "\n".join(lines) for name, lines in per_file_lines.items()} if per_file_lines else {}
+            logs = list(per_file_lines.keys())
 
-    if not logs:
-        st.warning("⚠️ Please upload at least one alert log to use Mistral AI analysis")
-    else:
-        if len(logs) > 1:
-            selected_log = st.selectbox("📂 Select Alert Log to Analyze:", list(logs.keys()))
-        else:
-            selected_log = list(logs.keys())[0]
-            st.info(f"📂 Selected: **{selected_log}**")
-
-        if "mistral_cache" not in st.session_state:
-            st.session_state.mistral_cache = {}
-
-        if st.button("🚀 Run Mistral AI Analysis", use_container_width=True):
-            if not user_prompt.strip():
-                st.warning("⚠️ Please enter your instruction before running analysis")
+            if not logs:
+                st.warning("⚠️ Please upload at least one alert log to use Mistral AI analysis")
             else:
-                snippet_lines = []
-                if use_filtered_segment and (not df_ora_display.empty or not df_warn_display.empty):
-                    file_lines = per_file_lines.get(selected_log, [])
-                    def add_context_from_df(df):
-                        for _, row in df[df["Source"] == selected_log].iterrows():
-                            raw_line = row.get("Raw Line", "")
-                            if not raw_line:
-                                continue
-                            try:
-                                idx = next((i for i, l in enumerate(file_lines) if raw_line in l), None)
-                            except Exception:
-                                idx = None
-                            if isinstance(idx, int):
-                                start_i = max(0, idx - 3)
-                                end_i = min(len(file_lines), idx + 4)
-                                snippet_lines.extend(file_lines[start_i:end_i])
-                            else:
-                                snippet_lines.append(raw_line)
-
-                    add_context_from_df(df_ora_display if not df_ora_display.empty else pd.DataFrame())
-                    add_context_from_df(df_warn_display if not df_warn_display.empty else pd.DataFrame())
-
-                    if not snippet_lines:
-                        snippet_lines = file_lines
+                if len(logs) > 1:
+                    selected_log = st.selectbox("📂 Select Alert Log to Analyze:", logs)
                 else:
-                    snippet_lines = per_file_lines.get(selected_log, [])
+                    selected_log = logs[0]
+                    st.info(f"📂 Selected: **{selected_log}**")
 
-                snippet = "\n".join(snippet_lines)[:MAX_PROMPT_CHARS]
-                if not snippet.strip():
-                    st.warning("⚠️ No log content available to send to AI")
-                else:
-                    error_summary = "\n".join([f"{r['Timestamp']} - {r['ORA Error']}" 
-                                               for _, r in df_ora_display[df_ora_display["Source"] == selected_log].iterrows()]) \
-                                    if not df_ora_display.empty else "No ORA errors in selected segment"
-                    full_prompt = f"""
-You are an Oracle Performance Expert analyzing the following alert log segment.
-User instruction:
-{user_prompt}
-
-Detected ORA Errors:
-{error_summary}
-
-Alert Log Extract:
-{snippet}
-"""
-
-                    cache_key = f"{selected_log}||{user_prompt.strip()}||{use_filtered_segment}||{global_start_dt.isoformat()}||{global_end_dt.isoformat()}"
-                    if cache_key in st.session_state.mistral_cache:
-                        ai_result = st.session_state.mistral_cache[cache_key]
-                    else:
-                        with st.spinner("🤖 Analyzing with Mistral AI..."):
-                            ai_result = ai_generate(full_prompt)
-                        st.session_state.mistral_cache[cache_key] = ai_result
+                # Replies on disk, shared by every session: a repeated analysis sends no requests
+                if "ai_cache" not in st.session_state:
+                    st.session_state.ai_cache = AIResponseCache()
+                ai_cache = st.session_state.ai_cache
 
-                    st.markdown("""
-                    <div style='background: white; padding: 2rem; border-radius: 8px; 
-                                border-left: 4px solid #667eea; margin-top: 1rem;'>
-                    """, unsafe_allow_html=True)
-                    st.markdown(ai_result)
-                    st.markdown("</div>", unsafe_allow_html=True)
+                if st.button("🚀 Run Mistral AI Analysis", use_container_width=True):
+                    if not user_prompt.strip():
+                        st.warning("⚠️ Please enter your instruction before running analysis")
+                    else:
+                        snippet_lines = []
+                        log_source = per_file_lines.source(selected_log)
+                        if use_filtered_segment and (not df_ora_display.empty or not df_warn_display.empty):
+                            def add_context_from_df(df, used_chars):
+                                # Each hit carries its byte offset, so its context is one small read
+                                if df.empty:
+                                    return used_chars
+                                hits = df[df["Source"] == selected_log]
+                                for offset, raw_line in zip(hits["Byte Offset"], hits["Raw Line"]):
+                                    if used_chars >= AI_MAX_CHARS:
+                                        break
+                                    if not raw_line:
+                                        continue
+                                    context = read_context(log_source, int(offset)) if pd.notna(offset) else [raw_line]
+                                    snippet_lines.extend(context)
+                                    used_chars += sum(len(l) + 1 for l in context)
+                                return used_chars
+
+                            used_chars = add_context_from_df(df_ora_display, 0)
+                            add_context_from_df(df_warn_display, used_chars)
+
+                            if not snippet_lines:
+                                snippet_lines = read_head_lines(log_source, AI_MAX_CHARS)
+                        else:
+                            snippet_lines = read_head_lines(log_source, AI_MAX_CHARS)
+
+                        snippet = "\n".join(snippet_lines)[:AI_MAX_CHARS]
+                        if not snippet.strip():
+                            st.warning("⚠️ No log content available to send to AI")
+                        else:
+                            # Every hit's count goes to the reduce step; the log text itself is split across requests
+                            selected_ora = df_ora_display[df_ora_display["Source"] == selected_log] \
+                                if not df_ora_display.empty else df_ora_display
+                            error_summary = "\n".join(f"{code}: {count} occurrence(s)"
+                                                      for code, count in observed_counts(selected_ora["ORA Error"]).items()) \
+                                            if not selected_ora.empty else "No ORA errors in selected segment"
+                            snippet_lines = snippet.splitlines()
+
+                            chunks = len(chunk_text(snippet_lines, MAX_PROMPT_CHARS))
+                            with st.spinner(f"🤖 Analyzing {chunks} chunk(s) with Mistral AI..."):
+                                ai_result = ai_generate(snippet_lines, user_prompt.strip(), error_summary, cache=ai_cache)
+
+                            st.markdown("""
+                            <div style='background: white; padding: 2rem; border-radius: 8px; 
+                                        border-left: 4px solid #667eea; margin-top: 1rem;'>
+                            """, unsafe_allow_html=True)
+                            st.markdown(ai_result)
+                            st.markdown("</div>", unsafe_allow_html=True)
+                            if ai_cache.enabled:
+                                st.caption(f"🗄️ AI cache: {ai_cache.hits} hit(s), {ai_cache.misses} miss(es)")
+
+
+ai_analysis_panel(per_file_lines, df_ora_display, df_warn_display, expand_ai)
 
 # ---------------- Download Section ----------------
 expand_download = st.session_state.get("voice_action") == "export"
-with st.expander("💾 Download Parsed Results", expanded=expand_download):
-    if (not combined_ora) and (not combined_warnings) and (not combined_kill_sessions):
-        st.info("🔭 No parsed data to download")
-    else:
-        st.markdown("""
-        <div style='background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); 
-                    padding: 1.5rem; border-radius: 8px; color: white; margin-bottom: 1rem;'>
-            <h4 style='margin: 0 0 0.5rem 0;'>📥 Export Your Analysis</h4>
-            <p style='margin: 0; opacity: 0.9;'>Download complete parsed results in Excel format</p>
-        </div>
-        """, unsafe_allow_html=True)
+@fragment
+def download_panel(df_ora_all, df_warn_all, df_kill_all, expand_download):
+    """Export of the parsed tables, generated only when the download button is clicked."""
+    with lazy_panel("💾 Download Parsed Results", "download_panel", expanded=expand_download) as panel_open:
+        if panel_open:
+            if df_ora_all.empty and df_warn_all.empty and df_kill_all.empty:
+                st.info("🔭 No parsed data to download")
+            else:
+                st.markdown("""
+                <div style='background: linear-gradient(135deg, #f093fb 0%, #f5576c 100%); 
+                            padding: 1.5rem; border-radius: 8px; color: white; margin-bottom: 1rem;'>
+                    <h4 style='margin: 0 0 0.5rem 0;'>📥 Export Your Analysis</h4>
+                    <p style='margin: 0; opacity: 0.9;'>Download complete parsed results as Excel, CSV, Parquet or JSON Lines</p>
+                </div>
+                """, unsafe_allow_html=True)
         
-        # Create separate sheets for better organization
-        buf = io.BytesIO()
-        with pd.ExcelWriter(buf, engine="xlsxwriter") as writer:
-            if not df_ora_all.empty:
-                df_ora_export = df_ora_all.copy()
-                # Convert timestamps for Excel compatibility
-                for col in df_ora_export.columns:
-                    if ptypes.is_datetime64_any_dtype(df_ora_export[col]):
-                        try:
-                            df_ora_export[col] = df_ora_export[col].dt.tz_localize(None)
-                        except:
-                            pass
-                df_ora_export.to_excel(writer, index=False, sheet_name="ORA_Errors")
-            
-            if not df_warn_all.empty:
-                df_warn_export = df_warn_all.copy()
-                for col in df_warn_export.columns:
-                    if ptypes.is_datetime64_any_dtype(df_warn_export[col]):
-                        try:
-                            df_warn_export[col] = df_warn_export[col].dt.tz_localize(None)
-                        except:
-                            pass
-                df_warn_export.to_excel(writer, index=False, sheet_name="Warnings")
-            
-            if not df_kill_all.empty:
-                df_kill_export = df_kill_all.copy()
-                for col in df_kill_export.columns:
-                    if ptypes.is_datetime64_any_dtype(df_kill_export[col]):
-                        try:
-                            df_kill_export[col] = df_kill_export[col].dt.tz_localize(None)
-                        except:
-                            pass
-                df_kill_export.to_excel(writer, index=False, sheet_name="Kill_Sessions")
-
-        filename = f"parsed_alert_log_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx"
-        st.download_button(
-            "📥 Download Excel Report", 
-            data=buf.getvalue(), 
-            file_name=filename, 
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            use_container_width=True
-        )
+                formats = [fmt for fmt in EXPORT_LABELS if fmt != "parquet" or PYARROW_AVAILABLE]
+                export_format = st.selectbox("📄 Format", formats, format_func=EXPORT_LABELS.get, key="export_format")
+                tables = {"ORA_Errors": [df_ora_all], "Warnings": [df_warn_all], "Kill_Sessions": [df_kill_all]}
+
+                def build_export():
+                    # Runs only when the button is clicked; rows are streamed to a temp file in chunks
+                    out = tempfile.TemporaryFile()
+                    write_export(tables, export_format, out)
+                    out.seek(0)
+                    return out
+
+                extension, mime = EXPORT_FORMATS[export_format]
+                filename = f"parsed_alert_log_{datetime.now().strftime('%Y%m%d_%H%M')}{extension}"
+                st.download_button(
+                    f"📥 Download {EXPORT_LABELS[export_format]}",
+                    data=build_export,
+                    file_name=filename,
+                    mime=mime,
+                    use_container_width=True
+                )
+
+
+download_panel(df_ora_all, df_warn_all, df_kill_all, expand_download)
 
 # ---------------- Footer ----------------
 st.markdown("---")
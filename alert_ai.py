@@ -0,0 +1,397 @@
+# alert_ai.py – Map-reduce AI summarization for Oracle Alert Log Analyzer Pro
+# Talks to the Mistral chat completions endpoint over plain HTTP (MISTRAL_API_URL can point
+# at a local stub server), with bounded concurrency, a token-bucket rate limit and backoff.
+
+import hashlib
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# ---------------- Config ----------------
+MISTRAL_API_URL = os.getenv("MISTRAL_API_URL", "https://api.mistral.ai/v1/chat/completions")
+MISTRAL_MODEL = os.getenv("MISTRAL_MODEL", "mistral-large-latest")
+AI_CHUNK_CHARS = 9000  # log text per map request
+AI_MAX_CHUNKS = int(os.getenv("ALERT_AI_MAX_CHUNKS", "32"))  # bounds the log text (and requests) per analysis
+AI_CONCURRENCY = int(os.getenv("ALERT_AI_CONCURRENCY", "4"))  # requests in flight at once
+AI_RATE_PER_SEC = float(os.getenv("ALERT_AI_RATE", "1"))  # token bucket refill rate; 0 disables the limit
+AI_BURST = int(os.getenv("ALERT_AI_BURST", "4"))  # token bucket size
+AI_MAX_RETRIES = 4  # retries per request after 429s, 5xx and connection errors
+AI_BACKOFF_SECONDS = 1.0  # first retry delay; doubles per attempt (with jitter) up to AI_BACKOFF_MAX_SECONDS
+AI_BACKOFF_MAX_SECONDS = 30.0
+AI_TIMEOUT_SECONDS = 60
+AI_CACHE_DIR = os.getenv("ALERT_AI_CACHE_DIR", os.path.join("~", ".cache", "alert_log_analyzer", "ai"))
+AI_CACHE_MAX_MB = int(os.getenv("ALERT_AI_CACHE_MB", "64"))  # 0 disables the AI response cache
+AI_CACHE_TTL_HOURS = float(os.getenv("ALERT_AI_CACHE_TTL_HOURS", "168"))  # replies older than this are asked again
+
+SYSTEM_PROMPT = (
+    "You are an Oracle DBA expert. Analyze ONLY the provided alert log text. "
+    "Do NOT invent or assume additional ORA errors not present in the provided logs. "
+    "If no ORA or warnings exist in the supplied segment, explicitly state that. "
+    "Provide a concise summary suitable for production DBAs (3–5 sentences)."
+)
+
+MAP_PROMPT = """
+You are an Oracle Performance Expert analyzing part {part} of {parts} of an alert log segment.
+User instruction:
+{instruction}
+
+Detected ORA Errors:
+{error_summary}
+
+Alert Log Extract:
+{text}
+"""
+
+REDUCE_PROMPT = """
+You are an Oracle Performance Expert. The summaries below each cover one part of the same alert log segment.
+Merge them into one answer to the user instruction, without repeating yourself.
+User instruction:
+{instruction}
+
+Detected ORA Errors:
+{error_summary}
+
+Part Summaries:
+{text}
+"""
+
+
+# ---------------- Errors ----------------
+class AIError(Exception):
+    """A chat completion request failed."""
+
+
+class RetryableAIError(AIError):
+    """Rate limited, overloaded or unreachable: worth retrying (after retry_after seconds, if given)."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ---------------- Rate Limiting ----------------
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens a second, at most `capacity` saved up.
+    acquire() blocks until a token is free. rate <= 0 never blocks.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+# ---------------- Response Cache ----------------
+def normalize_prompt(text):
+    """Prompt text with runs of spaces/tabs collapsed and blank lines and edge whitespace dropped."""
+    lines = (re.sub(r"[ \t]+", " ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def prompt_key(messages, model=MISTRAL_MODEL):
+    """Cache key of a chat request: hash of the model and every normalized message."""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(model.encode())
+    for message in messages:
+        h.update(b"\0" + message["role"].encode() + b"\0" + normalize_prompt(message["content"]).encode())
+    return h.hexdigest()
+
+
+class AIResponseCache:
+    """
+    Chat replies persisted under `directory` as one small JSON file per
+    prompt_key(), shared by every session and process using the directory.
+    Replies older than ttl_seconds are dropped on read; past max_bytes the
+    least recently used ones are evicted. hits / misses count lookups.
+    """
+
+    def __init__(self, directory=AI_CACHE_DIR, max_bytes=AI_CACHE_MAX_MB * 1024 * 1024,
+                 ttl_seconds=AI_CACHE_TTL_HOURS * 3600, clock=time.time):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.enabled = max_bytes > 0
+        if self.enabled:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+            except OSError:
+                self.enabled = False
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """The cached reply for `key`, or None (missing, expired or unreadable)."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as fh:
+                record = json.load(fh)
+            if record["key"] != key:
+                raise ValueError("hash collision")
+            if self._clock() - record["created"] > self.ttl_seconds:
+                os.unlink(path)
+                raise ValueError("expired")
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError, KeyError, TypeError):
+            self._count(False)
+            return None
+        self._count(True)
+        return record["reply"]
+
+    def put(self, key, reply):
+        """Store a reply, then evict down to max_bytes."""
+        if not self.enabled:
+            return
+        try:
+            fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=self.directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump({"key": key, "created": self._clock(), "reply": reply}, fh)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            return
+        self.evict()
+
+    def _entries(self):
+        """(last_used, size, path) of every stored reply."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json") and not entry.name.startswith("."):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue  # evicted by another session meanwhile
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """Remove least recently used replies until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+# ---------------- Client ----------------
+def chat_complete(messages, api_key, url=MISTRAL_API_URL, model=MISTRAL_MODEL, temperature=0.2,
+                  timeout=AI_TIMEOUT_SECONDS):
+    """One chat completion request; returns the reply text or raises AIError / RetryableAIError."""
+    body = json.dumps({"model": model, "messages": messages, "temperature": temperature}).encode("utf-8")
+    request = urllib.request.Request(url, data=body, method="POST", headers={
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            payload = json.loads(response.read().decode("utf-8"))
+    except urllib.error.HTTPError as e:
+        detail = e.read().decode("utf-8", errors="replace")[:300]
+        if e.code == 429 or e.code >= 500:
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            try:
+                retry_after = float(retry_after) if retry_after else None
+            except ValueError:
+                retry_after = None
+            raise RetryableAIError(f"HTTP {e.code}: {detail}", retry_after) from e
+        raise AIError(f"HTTP {e.code}: {detail}") from e
+    except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+        raise RetryableAIError(f"connection error: {getattr(e, 'reason', e)}") from e
+    try:
+        return payload["choices"][0]["message"]["content"].strip()
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        raise AIError(f"unexpected response: {str(payload)[:300]}") from e
+
+
+class AIClient:
+    """
+    chat_complete() behind a shared TokenBucket, with exponential backoff on
+    RetryableAIError, and map() to run many prompts at most `concurrency` at a time.
+    Replies found in `cache` (an AIResponseCache) are returned without a request.
+    `url` defaults to MISTRAL_API_URL as it is when the client is created.
+    `requests` and `retries` count what was sent, `cached` the replies taken from the cache.
+    """
+
+    def __init__(self, api_key, url=None, model=MISTRAL_MODEL, concurrency=AI_CONCURRENCY,
+                 rate=AI_RATE_PER_SEC, burst=AI_BURST, max_retries=AI_MAX_RETRIES,
+                 backoff=AI_BACKOFF_SECONDS, backoff_max=AI_BACKOFF_MAX_SECONDS, sleep=time.sleep, cache=None):
+        self.api_key = api_key
+        self.url = url or MISTRAL_API_URL
+        self.model = model
+        self.concurrency = max(1, concurrency)
+        self.bucket = TokenBucket(rate, burst, sleep=sleep)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.cache = cache
+        self.requests = 0
+        self.retries = 0
+        self.cached = 0
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+    def complete(self, prompt, system=SYSTEM_PROMPT):
+        messages = [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+        key = None
+        if self.cache is not None:
+            key = prompt_key(messages, self.model)
+            reply = self.cache.get(key)
+            if reply is not None:
+                with self._lock:
+                    self.cached += 1
+                return reply
+        reply = self._request(messages)
+        if key is not None:
+            self.cache.put(key, reply)
+        return reply
+
+    def _request(self, messages):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            with self._lock:
+                self.requests += 1
+            try:
+                return chat_complete(messages, self.api_key, url=self.url, model=self.model)
+            except RetryableAIError as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = e.retry_after
+                if delay is None:
+                    delay = min(self.backoff_max, self.backoff * 2 ** attempt) * (0.5 + random.random() / 2)
+                with self._lock:
+                    self.retries += 1
+                self._sleep(delay)
+
+    def map(self, prompts, progress=None):
+        """Reply (or the AIError raised) for every prompt, in order; progress(done, total) per reply."""
+        results = [None] * len(prompts)
+        done = []
+
+        def run(idx):
+            try:
+                results[idx] = self.complete(prompts[idx])
+            except AIError as e:
+                results[idx] = e
+            with self._lock:
+                done.append(idx)
+                count = len(done)
+            if progress:
+                progress(count, len(prompts))
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(prompts) or 1)) as pool:
+            list(pool.map(run, range(len(prompts))))
+        return results
+
+
+# ---------------- Map-Reduce ----------------
+def chunk_text(lines, max_chars=AI_CHUNK_CHARS):
+    """Join lines into pieces of at most max_chars, never splitting a line (over-long lines are cut)."""
+    chunks, current, size = [], [], 0
+    for line in lines:
+        line = line[:max_chars - 1]
+        if current and size + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _successful(results):
+    errors = [r for r in results if isinstance(r, AIError)]
+    replies = [r for r in results if not isinstance(r, AIError)]
+    if not replies and errors:
+        raise errors[0]
+    return replies, len(errors)
+
+
+def summarize(client, lines, instruction, error_summary="", chunk_chars=AI_CHUNK_CHARS, progress=None):
+    """
+    Map-reduce summary of log lines: chunk_text() pieces are summarized
+    concurrently through client.map(), then the part summaries are merged with
+    REDUCE_PROMPT, in rounds if they don't fit one request.
+
+    progress: optional callback(stage, done, total), stage "map" or "reduce".
+    Returns (summary, stats) with stats = {"chunks", "failed", "requests", "retries", "cached", "rounds"}.
+    """
+    chunks = chunk_text(lines, chunk_chars)
+    if not chunks:
+        raise AIError("no log content to analyze")
+    stats = {"chunks": len(chunks), "failed": 0, "rounds": 0}
+    prompts = [MAP_PROMPT.format(part=k, parts=len(chunks), instruction=instruction,
+                                 error_summary=error_summary or "None", text=text)
+               for k, text in enumerate(chunks, 1)]
+    report = (lambda done, total: progress("map", done, total)) if progress else None
+    summaries, stats["failed"] = _successful(client.map(prompts, progress=report))
+
+    # A single chunk's answer is already final; otherwise merge until one summary is left
+    while len(chunks) > 1:
+        stats["rounds"] += 1
+        parts = [f"--- Part {k} ---\n{s}" for k, s in enumerate(summaries, 1)]
+        groups = chunk_text(parts, chunk_chars)
+        if len(groups) >= len(parts):
+            # Summaries as long as a chunk: merge them two at a time so every round shrinks
+            groups = ["\n".join(parts[k:k + 2]) for k in range(0, len(parts), 2)]
+        prompts = [REDUCE_PROMPT.format(instruction=instruction, error_summary=error_summary or "None", text=text)
+                   for text in groups]
+        report = (lambda done, total: progress("reduce", done, total)) if progress else None
+        summaries, failed = _successful(client.map(prompts, progress=report))
+        stats["failed"] += failed
+        chunks = groups
+    stats["requests"] = client.requests
+    stats["retries"] = client.retries
+    stats["cached"] = client.cached
+    return summaries[0], stats
@@ -0,0 +1,182 @@
+# alert_cli.py – Headless batch runner for Oracle Alert Log Analyzer Pro
+# Run: python alert_cli.py /u01/app/oracle/diag/rdbms --format parquet -o report/
+# Uses the same parsing engine as the dashboard (alert_core) without importing Streamlit.
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+from alert_core import (
+    DEFAULT_LOG_PATTERNS,
+    DISK_CACHE_DIR,
+    DISK_CACHE_MAX_MB,
+    FLEET_LOG_PATTERNS,
+    LOCAL_TZ,
+    PYARROW_AVAILABLE,
+    DiskParseCache,
+    discover_logs,
+    fleet_summary,
+    instance_events_frame,
+    parse_logs,
+    source_name_for,
+    write_csv,
+    write_excel,
+    write_jsonl,
+    write_parquet,
+)
+
+# ---------------- Config ----------------
+OUTPUT_FORMATS = {"jsonl": ".jsonl", "csv": ".csv", "parquet": ".parquet", "xlsx": ".xlsx"}
+# table name -> cache entry key; "events" comes from entry["info"], "fleet" aggregates every file
+TABLES = {"ora": "df_ora", "warnings": "df_warn", "kill_sessions": "df_kill", "events": None, "fleet": None}
+DEFAULT_TABLES = ["ora", "warnings", "kill_sessions", "events"]
+
+
+# ---------------- Tables ----------------
+def build_tables(entries, names, tables):
+    """table name -> list of DataFrames (one per file; one in total for "fleet")."""
+    out = {}
+    for table in tables:
+        if table == "fleet":
+            out[table] = [fleet_summary(entries, names)]
+        elif table == "events":
+            out[table] = [instance_events_frame(entry["info"], name) for entry, name in zip(entries, names)]
+        else:
+            out[table] = [entry[TABLES[table]] for entry in entries]
+    return out
+
+
+# ---------------- Output ----------------
+def write_tables(tables, fmt, output_dir):
+    """<output_dir>/<table>.csv or .parquet for every table, streamed in chunks."""
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for table, frames in tables.items():
+        path = os.path.join(output_dir, table + OUTPUT_FORMATS[fmt])
+        if fmt == "csv":
+            with open(path, "w", newline="", encoding="utf-8") as fh:
+                write_csv(frames, fh)
+        else:
+            write_parquet(frames, path)
+        written.append(path)
+    return written
+
+
+# ---------------- Command Line ----------------
+def build_arg_parser():
+    ap = argparse.ArgumentParser(
+        prog="alert_cli.py",
+        description="Parse Oracle alert logs without the dashboard and write the results as JSON Lines, CSV or Parquet.",
+    )
+    ap.add_argument("paths", nargs="+", help="alert log files and/or directories to search")
+    ap.add_argument("-f", "--format", choices=sorted(OUTPUT_FORMATS), default="jsonl", help="output format (default: jsonl)")
+    ap.add_argument("-o", "--output", default=None,
+                    help="jsonl: output file, '-' for stdout (default); xlsx: output file (default: alert_report.xlsx); "
+                         "csv/parquet: output directory (default: alert_report)")
+    ap.add_argument("-t", "--tables", default=None,
+                    help=f"comma-separated tables to write, from {', '.join(TABLES)} "
+                         f"(default: {','.join(DEFAULT_TABLES)}; with --fleet: fleet)")
+    ap.add_argument("-p", "--pattern", action="append", default=None,
+                    help="file name pattern for directories, repeatable (default: *.log and *.txt; with --fleet: alert_*.log)")
+    ap.add_argument("--fleet", action="store_true",
+                    help="fleet scan: find alert_*.log under the given roots and summarize them per host/instance")
+    ap.add_argument("--since", default=None,
+                    help="only read lines stamped at or after this time, e.g. '2025-10-14 08:00' (local time); "
+                         "assumes chronological logs and skips the cache")
+    ap.add_argument("--until", default=None, help="only read lines stamped at or before this time (see --since)")
+    ap.add_argument("--no-recursive", action="store_true", help="only look at the top level of directories")
+    ap.add_argument("-j", "--workers", type=int, default=int(os.getenv("ALERT_PARSE_WORKERS", str(os.cpu_count() or 1))),
+                    help="parser processes (default: CPU count)")
+    ap.add_argument("--cache-dir", default=DISK_CACHE_DIR, help=f"parse cache directory (default: {DISK_CACHE_DIR})")
+    ap.add_argument("--no-cache", action="store_true", help="don't read or write the parse cache")
+    ap.add_argument("-q", "--quiet", action="store_true", help="no progress / summary on stderr")
+    return ap
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.tables is None:
+        tables = ["fleet"] if args.fleet else DEFAULT_TABLES
+    else:
+        tables = [t.strip() for t in args.tables.split(",") if t.strip()]
+    unknown = [t for t in tables if t not in TABLES]
+    if unknown:
+        print(f"alert_cli.py: unknown table(s): {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    if args.format == "parquet" and not PYARROW_AVAILABLE:
+        print("alert_cli.py: Parquet output needs pyarrow (pip install pyarrow)", file=sys.stderr)
+        return 2
+
+    def to_timestamp(value):
+        if not value:
+            return None
+        ts = pd.Timestamp(value)
+        return ts.tz_localize(LOCAL_TZ) if ts.tzinfo is None else ts
+
+    window = None
+    if args.since or args.until:
+        try:
+            window = (to_timestamp(args.since), to_timestamp(args.until))
+        except ValueError as e:
+            print(f"alert_cli.py: bad --since/--until time: {e}", file=sys.stderr)
+            return 2
+
+    def log(message):
+        if not args.quiet:
+            print(message, file=sys.stderr)
+
+    try:
+        patterns = args.pattern or (FLEET_LOG_PATTERNS if args.fleet else DEFAULT_LOG_PATTERNS)
+        paths = discover_logs(args.paths, patterns, recursive=not args.no_recursive)
+    except FileNotFoundError as e:
+        print(f"alert_cli.py: no such file or directory: {e}", file=sys.stderr)
+        return 2
+    if not paths:
+        print("alert_cli.py: no alert logs found", file=sys.stderr)
+        return 1
+
+    started = time.time()
+    files = [(source_name_for(path, args.paths), path) for path in paths]
+    cache = None if args.no_cache or window else DiskParseCache(args.cache_dir, DISK_CACHE_MAX_MB * 1024 * 1024)
+    done = []
+
+    def report(name):
+        done.append(name)
+        if not args.fleet:
+            log(f"parsed {name}")
+        elif len(done) % 25 == 0 or len(done) == len(files):
+            log(f"parsed {len(done)}/{len(files)} files")
+
+    entries = parse_logs(files, workers=max(1, args.workers), cache=cache, progress=report, window=window)
+    output = build_tables(entries, [name for name, _ in files], tables)
+
+    if args.format == "jsonl":
+        if args.output in (None, "-"):
+            write_jsonl(output, sys.stdout)
+        else:
+            with open(args.output, "w", encoding="utf-8") as fh:
+                write_jsonl(output, fh)
+    elif args.format == "xlsx":
+        # constant_memory workbook; tables past 1,048,576 rows continue on extra sheets
+        path = args.output or "alert_report.xlsx"
+        write_excel(output, path)
+        log(f"wrote {path}")
+    else:
+        for path in write_tables(output, args.format, args.output or "alert_report"):
+            log(f"wrote {path}")
+
+    if not args.fleet:
+        for (name, _), entry in zip(files, entries):
+            log(f"{name}: {len(entry['df_ora'])} ORA errors, {len(entry['df_warn'])} warnings, "
+                f"{len(entry['df_kill'])} kill sessions")
+    if cache is not None and cache.enabled:
+        log(f"cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+    log(f"{len(files)} file(s) in {time.time() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2414 @@
+# alert_core.py – Parsing engine for Oracle Alert Log Analyzer Pro
+# Kept free of Streamlit so it can be imported by worker processes.
+
+import re
+import sys
+import os
+import io
+import fnmatch
+import hashlib
+import json
+import shutil
+import tempfile
+import time
+import mmap
+import multiprocessing
+import shlex
+import threading
+import warnings
+import zipfile
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict, deque
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from contextlib import nullcontext
+from datetime import timezone, timedelta
+from dateutil import parser
+from itertools import chain, islice, tee
+
+# Optional: pyarrow backs the Parquet disk cache / export and Arrow-backed search text
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except Exception:
+    PYARROW_AVAILABLE = False
+
+# ---------------- Config ----------------
+LOCAL_TZ = timezone(timedelta(hours=5, minutes=30))  # IST +05:30
+PARSER_VERSION = "2"  # bump whenever parsing rules change so cached results are discarded
+STREAM_CHUNK_BYTES = 4 * 1024 * 1024  # read size for the streaming line reader
+LOOKAHEAD_LINES = 10  # kill-session blocks span up to 10 lines
+TRACE_LOOKAHEAD_LINES = 5  # a hit's trace file is the first .trc path within the next 5 lines
+CONTEXT_RADIUS_BYTES = 16 * 1024  # how far read_context() reads either side of a hit
+CHUNK_TARGET_BYTES = 32 * 1024 * 1024  # byte range handed to each worker when splitting one file
+CHUNKED_PARSE_MIN_MB = int(os.getenv("ALERT_CHUNKED_PARSE_MB", "64"))  # split single files at least this big
+DISK_CACHE_DIR = os.getenv("ALERT_CACHE_DIR", os.path.join("~", ".cache", "alert_log_analyzer"))
+DISK_CACHE_MAX_MB = int(os.getenv("ALERT_DISK_CACHE_MB", "4096"))  # 0 disables the on-disk parse cache
+BACKGROUND_CHUNK_BYTES = 8 * 1024 * 1024  # byte range a background parse publishes results for at a time
+SEEK_PROBE_BYTES = 64 * 1024  # how far a time-range probe reads looking for the next timestamp line
+EXPORT_CHUNK_ROWS = 50_000  # rows converted and written at a time by the exporters
+TEXT_INDEX_BLOCK_LINES = 64  # the full-text index records which 64-line block a token occurs in
+PREVIEW_SAMPLES = 16  # evenly spaced byte ranges a quick look reads besides the head and the tail
+PREVIEW_SAMPLE_BYTES = 256 * 1024  # size of each quick-look byte range
+
+# ---------------- Regex & Helpers ----------------
+TIMESTAMP_RE = re.compile(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+(?:[\+\-]\d{2}:\d{2}))")
+ORA_RE = re.compile(r"\bORA-(\d{3,5}):?\s*(.*)")
+WARN_RE = re.compile(r"\bWARNING\b|\bWarning\b|\bwarning\b")
+TRACE_RE = re.compile(r"(\/[\w\/\.\-\+]*\.trc)")
+KILL_SESSION_RE = re.compile(r"KILL SESSION for sid=\((\d+),\s*(\d+)\)", re.IGNORECASE)
+
+# Instance summary / lifecycle events
+RELEASE_RE = re.compile(r"(Release\s+\d+(?:\.\d+)*)", re.I)
+STARTUP_RE = re.compile(r"(Starting\s+ORACLE\s+instance|PMON has started|Starting up ORACLE)", re.I)
+SHUTDOWN_RE = re.compile(r"(Shutting down|shutdown\s+complete|Shutdown\s+normal|shutdown complete)", re.I)
+CRASH_RE = re.compile(
+    r"(Instance terminated|terminated abnormally|abort|crash|ORA-00600|ORA-07445|core dump|ORA-609)",
+    re.I
+)
+INSTANCE_NAME_RE = re.compile(r"Instance\s+name[:\s]*([A-Za-z0-9_\-\.]+)", re.I)
+HOST_RE = re.compile(r"Host\s*[:=]\s*([A-Za-z0-9\-\._]+)", re.I)
+ALTER_RE = re.compile(r"\bALTER\s+[A-Z_]+\b", re.I)  # ANY ALTER command
+RESIZE_RE = re.compile(r"\bRESIZE\b", re.I)  # ANY RESIZE command
+
+# First match wins, in this order
+INSTANCE_EVENT_PATTERNS = [
+    ("Alter Commands", ALTER_RE),
+    ("Resize Commands", RESIZE_RE),
+    ("Startup Events", STARTUP_RE),
+    ("Shutdown Events", SHUTDOWN_RE),
+    ("Crash Events", CRASH_RE),
+]
+
+# Literal words at least one of the instance patterns above needs (lowercase). A cheap
+# prefilter on the lowercased line rules out the vast majority of lines at once.
+INSTANCE_HINT_RE = re.compile("|".join(re.escape(w) for w in [
+    "release", "instance", "host", "alter", "resize", "start", "shut",
+    "terminated", "abort", "crash", "ora-00600", "ora-07445", "core dump", "ora-609",
+]))
+
+def _regex_fingerprint():
+    """Hash of every pattern above (and the lookahead sizes), so cached parses go stale when one changes."""
+    h = hashlib.blake2b(digest_size=8)
+    for name, value in sorted(globals().items()):
+        if isinstance(value, re.Pattern):
+            h.update(f"{name}:{value.flags}:{value.pattern}\n".encode())
+    h.update(repr(([k for k, _ in INSTANCE_EVENT_PATTERNS], LOOKAHEAD_LINES, TRACE_LOOKAHEAD_LINES)).encode())
+    return h.hexdigest()
+
+REGEX_FINGERPRINT = _regex_fingerprint()
+
+def _open_source(source):
+    """Binary handle for a file path, or the upload buffer itself (left open)."""
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, "rb")
+    return nullcontext(source)
+
+def decode_lines_with_offsets(block, offset=0):
+    """
+    Yield (byte_offset, line) for a block of raw bytes that starts at `offset`,
+    with the same lines as block.decode("utf-8", errors="ignore").splitlines().
+    """
+    try:
+        text = block.decode("utf-8")
+    except UnicodeDecodeError:
+        # Undecodable bytes get dropped, so measure each "\n"-terminated segment in raw bytes.
+        # Lines split on rarer separators (\r, \x0b, ...) share their segment's offset.
+        start = 0
+        while start < len(block):
+            nl = block.find(b"\n", start)
+            end = len(block) if nl == -1 else nl + 1
+            for line in block[start:end].decode("utf-8", errors="ignore").splitlines():
+                yield offset + start, line
+            start = end
+        return
+    ascii_only = block.isascii()
+    for piece, line in zip(text.splitlines(keepends=True), text.splitlines()):
+        yield offset, line
+        offset += len(piece) if ascii_only else len(piece.encode("utf-8"))
+
+def iter_alert_log_lines(source, chunk_size=STREAM_CHUNK_BYTES, with_offsets=False):
+    """
+    Stream decoded lines from an upload buffer or a file path, chunk_size bytes at a time.
+    Yields exactly what source.read().decode("utf-8", errors="ignore").splitlines() would,
+    without ever holding the whole file (or its decoded copy) in memory.
+    With with_offsets=True, yields (byte_offset, line) pairs instead.
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+
+    with _open_source(source) as fh:
+        carry = b""
+        carry_offset = 0
+        while True:
+            block = fh.read(chunk_size)
+            if not block:
+                break
+            block = carry + block
+            # Only decode up to the last "\n" so no line (or UTF-8 sequence) is split
+            cut = block.rfind(b"\n") + 1
+            if not cut:
+                carry = block
+                continue
+            carry = block[cut:]
+            if with_offsets:
+                yield from decode_lines_with_offsets(block[:cut], carry_offset)
+            else:
+                yield from block[:cut].decode("utf-8", errors="ignore").splitlines()
+            carry_offset += cut
+        if carry:
+            if with_offsets:
+                yield from decode_lines_with_offsets(carry, carry_offset)
+            else:
+                yield from carry.decode("utf-8", errors="ignore").splitlines()
+
+def unzip_offsets(pairs):
+    """Split (byte_offset, line) pairs into a line iterator and an offset iterator for scan_alert_log()."""
+    first, second = tee(pairs)
+    return (line for _, line in first), (offset for offset, _ in second)
+
+def read_context(source, byte_offset, before=3, after=3, radius=CONTEXT_RADIUS_BYTES):
+    """
+    The `before` lines preceding the line that starts at byte_offset, that line, and
+    the `after` lines following it, read straight from the upload buffer or file path.
+    Costs one small seek + read per hit; lines longer than `radius` bytes are cut off.
+    """
+    start = max(0, byte_offset - radius)
+    with _open_source(source) as fh:
+        fh.seek(start)
+        data = fh.read(byte_offset - start + radius)
+    split = byte_offset - start
+    head = data[:split].decode("utf-8", errors="ignore").splitlines()
+    if start > 0 and head:
+        head = head[1:]  # probably starts mid-line
+    tail = data[split:].decode("utf-8", errors="ignore").splitlines()
+    if len(data) - split == radius and len(tail) > after + 1:
+        tail = tail[:-1]  # probably ends mid-line
+    return (head[-before:] if before else []) + tail[:after + 1]
+
+def read_head_lines(source, max_chars):
+    """Leading lines of a log, stopping once about max_chars characters are collected."""
+    lines, total = [], 0
+    for line in iter_alert_log_lines(source):
+        if total >= max_chars:
+            break
+        lines.append(line)
+        total += len(line) + 1
+    return lines
+
+def lines_from_uploaded_file(f):
+    return list(iter_alert_log_lines(f))
+
+def hit_table(columns):
+    """Column-wise hit storage: one list per column instead of one dict per hit."""
+    return {col: [] for col in columns}
+
+def append_hit(table, values):
+    for column, value in zip(table.values(), values):
+        column.append(value)
+
+def hit_count(table):
+    return len(next(iter(table.values())))
+
+def hit_records(table):
+    """A hit_table() as the list of per-hit dicts the older API returned."""
+    return [dict(zip(table, row)) for row in zip(*table.values())]
+
+def iter_with_lookahead(lines, size=LOOKAHEAD_LINES):
+    """
+    Yield (index, window) over any iterable of lines. window[0] is the current line and
+    window[1:] the following size-1 lines; the deque is reused, so don't keep it around.
+    """
+    it = iter(lines)
+    window = deque(islice(it, size))
+    idx = 0
+    while window:
+        yield idx, window
+        window.popleft()
+        window.extend(islice(it, 1))
+        idx += 1
+
+class TraceIndex:
+    """
+    Sorted line-number -> trace path index of every .trc reference in a log.
+    Lookups are binary searches, so resolving N hits against T traces costs N·log T.
+    """
+
+    def __init__(self):
+        self.positions = []
+        self.paths = []
+
+    def __len__(self):
+        return len(self.positions)
+
+    def add(self, line_no, path):
+        """Record a trace reference; line numbers must arrive in increasing order."""
+        self.positions.append(line_no)
+        self.paths.append(path)
+
+    def trace_at(self, line_no):
+        """Trace path referenced on exactly this line, or None."""
+        k = bisect_left(self.positions, line_no)
+        if k < len(self.positions) and self.positions[k] == line_no:
+            return self.paths[k]
+        return None
+
+    def nearest(self, line_no, lookahead=TRACE_LOOKAHEAD_LINES, default="Not Found"):
+        """First trace referenced on line_no or within the following `lookahead` lines."""
+        k = bisect_left(self.positions, line_no)
+        if k < len(self.positions) and self.positions[k] - line_no <= lookahead:
+            return self.paths[k]
+        return default
+
+    def truncate(self, end):
+        """Drop references on line `end` and later."""
+        k = bisect_left(self.positions, end)
+        del self.positions[k:], self.paths[k:]
+
+    def extend(self, other, offset=0):
+        """Append another index whose line numbers start `offset` lines later."""
+        self.positions.extend(p + offset for p in other.positions)
+        self.paths.extend(other.paths)
+
+    def between(self, start, end):
+        """All (line_no, path) references with start <= line_no <= end."""
+        lo = bisect_left(self.positions, start)
+        hi = bisect_right(self.positions, end)
+        return list(zip(self.positions[lo:hi], self.paths[lo:hi]))
+
+def extract_kill_session_details(window):
+    """Extract detailed information from KILL SESSION block - OPTIMIZED"""
+    details = {
+        "reason": "Not Found",
+        "mode": "Not Found",
+        "requestor": "Not Found",
+        "owner": "Not Found",
+        "result": "Not Found",
+        "full_block": []
+    }
+    
+    # Look ahead up to 10 lines for details
+    for j, line in enumerate(window):
+        details["full_block"].append(line)
+        
+        line_stripped = line.strip()
+        
+        if "Reason =" in line_stripped:
+            details["reason"] = line_stripped.split("Reason =", 1)[1].strip()
+        elif "Mode =" in line_stripped:
+            details["mode"] = line_stripped.split("Mode =", 1)[1].strip()
+        elif "Requestor =" in line_stripped:
+            details["requestor"] = line_stripped.split("Requestor =", 1)[1].strip()
+        elif "Owner =" in line_stripped:
+            details["owner"] = line_stripped.split("Owner =", 1)[1].strip()
+        elif "Result =" in line_stripped:
+            details["result"] = line_stripped.split("Result =", 1)[1].strip()
+        
+        # Stop early if we hit another timestamp or KILL SESSION
+        if j > 0 and (TIMESTAMP_RE.search(line_stripped) or KILL_SESSION_RE.search(line_stripped)):
+            break
+    
+    return details
+
+def record_instance_line(info, text, idx, timestamp):
+    """Instance / host / release metadata and lifecycle events for one line."""
+    rel = RELEASE_RE.search(text)
+    if rel:
+        info["Oracle Releases"].add(rel.group(1))
+
+    inst = INSTANCE_NAME_RE.search(text)
+    if inst:
+        info["Instance Names"].add(inst.group(1))
+
+    host = HOST_RE.search(text)
+    if host:
+        info["Hostnames"].add(host.group(1))
+
+    for key, pattern in INSTANCE_EVENT_PATTERNS:
+        if pattern.search(text):
+            info[key].append({
+                "Timestamp": timestamp or "Not Found",
+                "Line": text.strip(),
+                "Index": idx
+            })
+            break
+
+def scan_alert_log(lines, source_name="uploaded", initial_timestamp=None, limit=None, offsets=None):
+    """
+    Single pass over an alert log (list or line iterator) that produces everything
+    analyze_alert_log_lines() and detect_instance_summary_and_events() report.
+
+    initial_timestamp: timestamp in effect before the first line (for logs read
+        from the middle); hits ahead of the first timestamp line get it.
+    limit: only the first `limit` lines are reported; any lines after them are
+        used as lookahead context (kill-session blocks, nearby trace files).
+    offsets: optional iterator of each reported line's byte offset in the file
+        (see iter_alert_log_lines(with_offsets=True)); stored as "Byte Offset".
+
+    Returns:
+        {
+            "ora": ORA error hits (a hit_table() of ORA_COLUMNS),
+            "warnings": warning hits (WARN_COLUMNS),
+            "kill_sessions": KILL SESSION hits (KILL_COLUMNS),
+            "info": instance names/hosts/releases and lifecycle events,
+            "trace_index": TraceIndex of every .trc reference,
+            "last_timestamp": timestamp in effect after the last reported line,
+            "line_count": number of reported lines
+        }
+    """
+    ora_errors = hit_table(ORA_COLUMNS)
+    warn_hits = hit_table(WARN_COLUMNS)
+    kill_sessions = hit_table(KILL_COLUMNS)
+    info = {
+        "Instance Names": set(),
+        "Hostnames": set(),
+        "Oracle Releases": set(),
+        "Startup Events": [],
+        "Shutdown Events": [],
+        "Crash Events": [],
+        "Alter Commands": [],
+        "Resize Commands": []
+    }
+    current_timestamp = initial_timestamp
+    line_count = 0
+
+    # Trace paths are indexed as the scan goes; hits are resolved once all are known
+    trace_index = TraceIndex()
+
+    for i, window in iter_with_lookahead(lines):
+        raw = window[0]
+        trace_m = TRACE_RE.search(raw)
+        if trace_m:
+            trace_index.add(i, trace_m.group(1))
+
+        if limit is not None and i >= limit:
+            # Context past the reported range only feeds trace lookups
+            if i - limit >= TRACE_LOOKAHEAD_LINES:
+                break
+            continue
+        line_count = i + 1
+        offset = next(offsets) if offsets is not None else None
+
+        line = raw.rstrip("\n")
+        ts_m = TIMESTAMP_RE.search(line)
+        if ts_m:
+            current_timestamp = ts_m.group(1)
+
+        # re.I also folds a few non-ASCII letters (e.g. "ſ"), so those lines skip the prefilter
+        if not line.isascii() or INSTANCE_HINT_RE.search(line.lower()):
+            record_instance_line(info, line, i, current_timestamp)
+
+        if ts_m or not line.strip():
+            continue
+
+        # Check for KILL SESSION event
+        kill_m = KILL_SESSION_RE.search(line)
+        if kill_m:
+            sid = kill_m.group(1)
+            serial = kill_m.group(2)
+            details = extract_kill_session_details(window)
+            
+            append_hit(kill_sessions, (
+                current_timestamp or "Not Found",
+                sid,
+                serial,
+                details["reason"],
+                sys.intern(details["mode"]),
+                details["requestor"],
+                sys.intern(details["owner"]),
+                details["result"],
+                None,
+                source_name,
+                line,
+                "\n".join(details["full_block"]),
+                i,
+                offset,
+            ))
+            continue
+
+        ora_m = ORA_RE.search(line)
+        if ora_m:
+            code = f"ORA-{ora_m.group(1)}"
+            if code not in {"ORA-0"}:
+                append_hit(ora_errors, (
+                    current_timestamp or "Not Found",
+                    sys.intern(code),
+                    None,
+                    source_name,
+                    line,
+                    i,
+                    offset,
+                ))
+        elif WARN_RE.search(line):
+            append_hit(warn_hits, (
+                current_timestamp or "Not Found",
+                line.strip(),
+                None,
+                source_name,
+                line,
+                i,
+                offset,
+            ))
+
+    # Every .trc path is known now, so resolve each hit's nearest trace file
+    for table in (ora_errors, warn_hits, kill_sessions):
+        table["Trace File"] = [trace_index.nearest(i) for i in table["Line Index"]]
+    trace_index.truncate(line_count)
+
+    # Convert sets to sorted lists
+    for k in ["Instance Names", "Hostnames", "Oracle Releases"]:
+        info[k] = sorted(info[k])
+
+    return {
+        "ora": ora_errors,
+        "warnings": warn_hits,
+        "kill_sessions": kill_sessions,
+        "info": info,
+        "trace_index": trace_index,
+        "last_timestamp": current_timestamp,
+        "line_count": line_count,
+    }
+
+def analyze_alert_log_lines(lines, source_name="uploaded"):
+    """ORA errors, warnings and kill sessions of a log as lists of dicts; see scan_alert_log()."""
+    result = scan_alert_log(lines, source_name=source_name)
+    return hit_records(result["ora"]), hit_records(result["warnings"]), hit_records(result["kill_sessions"])
+
+def parse_iso_timestamp(ts):
+    if not ts or ts == "Not Found":
+        return None
+    try:
+        dt = parser.isoparse(ts)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=LOCAL_TZ)
+        return dt
+    except Exception:
+        try:
+            dt = parser.parse(ts, fuzzy=True)
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=LOCAL_TZ)
+            return dt
+        except Exception:
+            return None
+
+# ---------------- Timestamp Engine ----------------
+# Alert log timestamps always have this shape (see TIMESTAMP_RE)
+ALERT_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+TIMESTAMP_MEMO_MAX = 1_000_000
+_timestamp_memo = {}  # timestamp string -> UTC pd.Timestamp or NaT, shared by every rerun
+
+def parse_unique_timestamps(values):
+    """
+    Parse distinct timestamp strings into a LOCAL_TZ DatetimeIndex. Unseen strings go
+    through one vectorized to_datetime call with ALERT_TIMESTAMP_FORMAT; only what that
+    can't read falls back to parse_iso_timestamp(). Every result is memoized.
+    """
+    parsed = [None] * len(values)
+    todo_idx, todo = [], []
+    for i, value in enumerate(values):
+        hit = _timestamp_memo.get(value)
+        if hit is None:
+            todo_idx.append(i)
+            todo.append(value)
+        else:
+            parsed[i] = hit
+
+    if todo:
+        fast = pd.to_datetime(pd.Series(todo, dtype=object), format=ALERT_TIMESTAMP_FORMAT, errors="coerce", utc=True)
+        if len(_timestamp_memo) + len(todo) > TIMESTAMP_MEMO_MAX:
+            _timestamp_memo.clear()
+        for i, value, ts in zip(todo_idx, todo, fast):
+            if ts is pd.NaT:
+                dt = parse_iso_timestamp(value)
+                ts = pd.Timestamp(dt).tz_convert("UTC") if dt is not None else pd.NaT
+            parsed[i] = ts
+            _timestamp_memo[value] = ts
+
+    return pd.DatetimeIndex(pd.to_datetime(parsed, utc=True)).tz_convert(LOCAL_TZ)
+
+def parse_timestamp_series(timestamps):
+    """ParsedTimestamp column for a Series of timestamp strings; each distinct string is parsed once."""
+    codes, uniques = pd.factorize(timestamps)
+    parsed = parse_unique_timestamps(list(uniques))
+    return pd.Series(parsed.take(codes, allow_fill=True, fill_value=pd.NaT), index=timestamps.index)
+
+
+def detect_instance_summary_and_events(all_lines):
+    """
+    Scans a list of raw log lines and extracts instance names, hostnames,
+    releases, startup events, shutdown events, crash events,
+    ALTER commands, and RESIZE commands.
+    """
+    return scan_alert_log(all_lines)["info"]
+
+# ---------------- Parse Result Cache ----------------
+# Column order of the hit tables the scanner emits
+ORA_COLUMNS = ["Timestamp", "ORA Error", "Trace File", "Source", "Raw Line", "Line Index", "Byte Offset"]
+WARN_COLUMNS = ["Timestamp", "Warning Message", "Trace File", "Source", "Raw Line", "Line Index", "Byte Offset"]
+KILL_COLUMNS = ["Timestamp", "SID", "Serial#", "Reason", "Mode", "Requestor", "Owner", "Result", "Trace File", "Source", "Raw Line", "Full Block", "Line Index", "Byte Offset"]
+# Text columns with few distinct values per file (raw lines repeat too: the same error recurs)
+CATEGORY_COLUMNS = {
+    "Timestamp", "ORA Error", "Warning Message", "SID", "Serial#", "Reason", "Mode", "Requestor",
+    "Owner", "Result", "Trace File", "Source", "Raw Line", "Full Block",
+}
+INSTANCE_SET_KEYS = ["Instance Names", "Hostnames", "Oracle Releases"]
+INSTANCE_EVENT_KEYS = ["Startup Events", "Shutdown Events", "Crash Events", "Alter Commands", "Resize Commands"]
+
+
+class ParseCache:
+    """
+    LRU cache of per-file parse results, bounded by an approximate memory cap.
+    Entries are keyed by parse_cache_key(), so identical uploads are never re-scanned.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._sizes = {}
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry, size):
+        self.discard(key)
+        if size > self.max_bytes:
+            return  # larger than the whole cache, keep it for this run only
+        self._entries[key] = entry
+        self._sizes[key] = size
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes:
+            self.discard(next(iter(self._entries)))
+
+    def discard(self, key):
+        if key in self._entries:
+            del self._entries[key]
+            self.total_bytes -= self._sizes.pop(key)
+
+
+def parse_cache_key(f, source_name):
+    """Content hash of an uploaded file + its name + PARSER_VERSION + REGEX_FINGERPRINT."""
+    try:
+        data = f.getbuffer()
+    except AttributeError:
+        f.seek(0)
+        data = f.read()
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    return f"{PARSER_VERSION}:{REGEX_FINGERPRINT}:{source_name}:{digest}"
+
+
+def file_cache_key(path, source_name, chunk_size=STREAM_CHUNK_BYTES):
+    """parse_cache_key() for a file on disk, hashed without reading it into memory at once."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(chunk_size), b""):
+            h.update(block)
+    return f"{PARSER_VERSION}:{REGEX_FINGERPRINT}:{source_name}:{h.hexdigest()}"
+
+
+def compact_frame(table, columns):
+    """
+    DataFrame from a hit_table() (or list of hit dicts) with repetitive text columns
+    stored as categoricals: each distinct string is kept once and rows hold small
+    integer codes. ParsedTimestamp is an int64-backed datetime64 column.
+    """
+    if isinstance(table, dict):
+        df = pd.DataFrame(table, columns=columns)
+    else:
+        df = pd.DataFrame(table, columns=columns) if table else pd.DataFrame(columns=columns)
+    for col in columns:
+        if col in CATEGORY_COLUMNS:
+            # Empty columns come out float64; keep every file's categories object-typed so they concat
+            df[col] = (df[col].astype(object) if df.empty else df[col]).astype("category")
+        elif col in ("Line Index", "Byte Offset") and df[col].notna().all():
+            df[col] = df[col].astype("int64")
+    df["ParsedTimestamp"] = parse_timestamp_series(df["Timestamp"])
+    return df
+
+
+def build_parsed_frames(ora, warn_hits, kill_sessions):
+    """Turn parsed hits into compact DataFrames with a ParsedTimestamp column."""
+    return [
+        compact_frame(ora, ORA_COLUMNS),
+        compact_frame(warn_hits, WARN_COLUMNS),
+        compact_frame(kill_sessions, KILL_COLUMNS),
+    ]
+
+
+def concat_frames(frames):
+    """pd.concat for compact frames that keeps categorical columns categorical across files."""
+    if len(frames) == 1:
+        return frames[0].copy(deep=False)
+    frames = list(frames)
+    for col in frames[0].columns:
+        if isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            categories = union_categoricals([df[col] for df in frames]).categories
+            frames = [df.assign(**{col: df[col].cat.set_categories(categories)}) for df in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def export_ready(df):
+    """Shallow copy with timezone-naive datetimes, for writers (Excel) that reject tz-aware values."""
+    df = df.copy(deep=False)
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]) and getattr(df[col].dt, "tz", None) is not None:
+            df[col] = df[col].dt.tz_localize(None)
+    return df
+
+
+def instance_events_frame(info, source_name=None):
+    """Instance lifecycle events of detect_instance_summary_and_events() as one table."""
+    rows = [
+        (source_name, kind, e["Timestamp"], e["Line"], e["Index"])
+        for kind in INSTANCE_EVENT_KEYS for e in info[kind]
+    ]
+    return pd.DataFrame(rows, columns=["Source", "Event", "Timestamp", "Line", "Line Index"])
+
+
+def observed_counts(values):
+    """value_counts() without the zero rows a categorical keeps for categories filtered out."""
+    counts = values.value_counts()
+    return counts[counts > 0]
+
+
+def parse_alert_log_file(f, source_name):
+    """Parse one upload buffer or file path into a cacheable entry (hits, frames and instance info)."""
+    lines, offsets = unzip_offsets(iter_alert_log_lines(f, with_offsets=True))
+    return finalize_entry(scan_alert_log(lines, source_name=source_name, offsets=offsets))
+
+
+def finalize_entry(entry):
+    """
+    Replace a scan result's hit columns with the compact DataFrames and search
+    text that the dashboard needs.
+    """
+    entry["df_ora"], entry["df_warn"], entry["df_kill"] = build_parsed_frames(
+        entry.pop("ora"), entry.pop("warnings"), entry.pop("kill_sessions")
+    )
+    entry["search"] = {
+        "ora": build_search_text(entry["df_ora"], ORA_SEARCH_COLUMNS),
+        "warnings": build_search_text(entry["df_warn"], WARN_SEARCH_COLUMNS),
+        "kill_sessions": build_search_text(entry["df_kill"], KILL_SEARCH_COLUMNS),
+    }
+    return entry
+
+
+def estimate_entry_size(entry):
+    """Resident size of a cache entry: its frames and search text, plus the trace index."""
+    size = 4096 + 128 * len(entry["trace_index"])
+    for key in ("df_ora", "df_warn", "df_kill"):
+        size += int(entry[key].memory_usage(index=True, deep=True).sum())
+    for text in entry["search"].values():
+        size += int(text.memory_usage(index=True, deep=True))
+    return size
+
+
+class LazyFileLines(Mapping):
+    """
+    name -> list of lines, decoded from the upload buffer only when a panel
+    (compare, AI context) actually asks for that file.
+    """
+
+    def __init__(self):
+        self._sources = {}
+        self._lines = {}
+
+    def add(self, name, source):
+        self._sources[name] = source
+        self._lines.pop(name, None)
+
+    def source(self, name):
+        """The upload buffer / path behind `name`, for offset-based reads (read_context())."""
+        return self._sources[name]
+
+    def __getitem__(self, name):
+        if name not in self._lines:
+            self._lines[name] = lines_from_uploaded_file(self._sources[name])
+        return self._lines[name]
+
+    def __iter__(self):
+        return iter(self._sources)
+
+    def __len__(self):
+        return len(self._sources)
+
+
+def merge_instance_info(infos):
+    """Combine per-file detect_instance_summary_and_events() results."""
+    merged = {k: set() for k in INSTANCE_SET_KEYS}
+    merged.update({k: [] for k in INSTANCE_EVENT_KEYS})
+    for info in infos:
+        for k in INSTANCE_SET_KEYS:
+            merged[k].update(info[k])
+        for k in INSTANCE_EVENT_KEYS:
+            merged[k].extend(info[k])
+    for k in INSTANCE_SET_KEYS:
+        merged[k] = sorted(merged[k])
+    return merged
+
+
+# ---------------- Disk Cache ----------------
+DISK_CACHE_AVAILABLE = PYARROW_AVAILABLE  # Parquet needs pyarrow; without it the disk cache stays disabled
+
+DISK_CACHE_TABLES = {
+    "df_ora": ("ora", ORA_COLUMNS),
+    "df_warn": ("warnings", WARN_COLUMNS),
+    "df_kill": ("kill_sessions", KILL_COLUMNS),
+}
+_SEARCH_COLUMN = "__search__"
+FILE_KEYS_NAME = "file_keys.json"
+TEXT_INDEX_NAME = "fulltext.npz"
+
+
+class DiskParseCache:
+    """
+    Parse results persisted under `directory`, one sub-directory per
+    parse_cache_key(): the hit tables (with their search text) and the
+    instance events as Parquet, plus a small meta.json. Bounded by max_bytes;
+    the least recently used entries are evicted first. Entries written by
+    another PARSER_VERSION / REGEX_FINGERPRINT are removed on open.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._file_keys = None  # path -> {"stat": [...], "key": ...}, see file_key()
+        self.enabled = DISK_CACHE_AVAILABLE and max_bytes > 0
+        if self.enabled:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                self._purge_stale()
+            except OSError:
+                self.enabled = False
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.blake2b(key.encode(), digest_size=16).hexdigest())
+
+    def file_key(self, path, source_name):
+        """
+        file_cache_key() of a file on disk, without re-hashing it when its size,
+        mtime and inode are unchanged since the last time it was hashed here.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        if self._file_keys is None:
+            try:
+                with open(os.path.join(self.directory, FILE_KEYS_NAME)) as fh:
+                    self._file_keys = json.load(fh)
+            except (OSError, ValueError):
+                self._file_keys = {}
+        known = self._file_keys.get(path)
+        prefix = f"{PARSER_VERSION}:{REGEX_FINGERPRINT}:{source_name}:"
+        if known and known["stat"] == signature and known["key"].startswith(prefix):
+            return known["key"]
+        key = file_cache_key(path, source_name)
+        self._file_keys[path] = {"stat": signature, "key": key}
+        return key
+
+    def save_file_keys(self):
+        """Persist what file_key() learned, for the next run."""
+        if not self.enabled or not self._file_keys:
+            return
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=self.directory)
+        with os.fdopen(fd, "w") as fh:
+            json.dump(self._file_keys, fh)
+        os.replace(tmp, os.path.join(self.directory, FILE_KEYS_NAME))
+
+    def _entries(self):
+        """(last_used, size, path) of every complete entry."""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            meta = os.path.join(path, "meta.json")
+            if os.path.isfile(meta):
+                size = sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+                entries.append((os.path.getmtime(meta), size, path))
+        return entries
+
+    def _purge_stale(self):
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if not os.path.isdir(path):
+                continue
+            try:
+                with open(os.path.join(path, "meta.json")) as fh:
+                    meta = json.load(fh)
+                if meta.get("parser_version") == PARSER_VERSION and meta.get("regex") == REGEX_FINGERPRINT:
+                    continue
+            except (OSError, ValueError):
+                if name.startswith(".") and time.time() - os.path.getmtime(path) < 3600:
+                    continue  # another process may still be writing this one
+            shutil.rmtree(path, ignore_errors=True)
+
+    def get(self, key):
+        """The cached entry for `key`, or None."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(os.path.join(path, "meta.json")) as fh:
+                meta = json.load(fh)
+            if meta["key"] != key:
+                raise ValueError("hash collision")
+            entry = {"search": {}}
+            for frame_key, (search_key, columns) in DISK_CACHE_TABLES.items():
+                df = pd.read_parquet(os.path.join(path, f"{search_key}.parquet"))
+                entry["search"][search_key] = df.pop(_SEARCH_COLUMN).astype(SEARCH_DTYPE)
+                if df.empty:
+                    df = compact_frame(hit_table(columns), columns)  # Parquet loses empty columns' dtypes
+                else:
+                    df["ParsedTimestamp"] = df["ParsedTimestamp"].dt.tz_convert(LOCAL_TZ)
+                entry[frame_key] = df
+            events = pd.read_parquet(os.path.join(path, "events.parquet"))
+            traces = pd.read_parquet(os.path.join(path, "traces.parquet"))
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+
+        info = {k: meta["info"][k] for k in INSTANCE_SET_KEYS}
+        info.update({k: [] for k in INSTANCE_EVENT_KEYS})
+        for kind, timestamp, line, index in events.itertuples(index=False):
+            info[kind].append({"Timestamp": timestamp, "Line": line, "Index": int(index)})
+        trace_index = TraceIndex()
+        trace_index.positions = traces["position"].tolist()
+        trace_index.paths = traces["path"].tolist()
+        entry.update({
+            "info": info,
+            "trace_index": trace_index,
+            "last_timestamp": meta["last_timestamp"],
+            "line_count": meta["line_count"],
+        })
+        os.utime(os.path.join(path, "meta.json"))  # mark as recently used
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        """Persist a finalize_entry() result, then evict down to max_bytes."""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=self.directory)
+        try:
+            for frame_key, (search_key, _) in DISK_CACHE_TABLES.items():
+                df = entry[frame_key].assign(**{_SEARCH_COLUMN: entry["search"][search_key]})
+                df.to_parquet(os.path.join(tmp, f"{search_key}.parquet"), index=False)
+            events = [
+                (kind, e["Timestamp"], e["Line"], e["Index"])
+                for kind in INSTANCE_EVENT_KEYS for e in entry["info"][kind]
+            ]
+            pd.DataFrame(events, columns=["Kind", "Timestamp", "Line", "Index"]).to_parquet(
+                os.path.join(tmp, "events.parquet"), index=False
+            )
+            pd.DataFrame({
+                "position": pd.Series(entry["trace_index"].positions, dtype="int64"),
+                "path": pd.Series(entry["trace_index"].paths, dtype=object),
+            }).to_parquet(os.path.join(tmp, "traces.parquet"), index=False)
+            meta = {
+                "key": key,
+                "parser_version": PARSER_VERSION,
+                "regex": REGEX_FINGERPRINT,
+                "info": {k: list(entry["info"][k]) for k in INSTANCE_SET_KEYS},
+                "last_timestamp": entry["last_timestamp"],
+                "line_count": entry["line_count"],
+            }
+            with open(os.path.join(tmp, "meta.json"), "w") as fh:
+                json.dump(meta, fh)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+
+    def get_text_index(self, key):
+        """The TextIndex stored next to the cached entry for `key`, or None."""
+        if not self.enabled:
+            return None
+        try:
+            return TextIndex.load(os.path.join(self._path(key), TEXT_INDEX_NAME))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def put_text_index(self, key, index):
+        """Store a TextIndex with the cached entry for `key` (evicted together with it)."""
+        path = self._path(key)
+        if not self.enabled or not os.path.isfile(os.path.join(path, "meta.json")):
+            return
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", suffix=".npz", dir=path)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                index.save(fh)
+            os.replace(tmp, os.path.join(path, TEXT_INDEX_NAME))
+        except OSError:
+            os.unlink(tmp)
+            return
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self._entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# ---------------- Search ----------------
+ORA_SEARCH_COLUMNS = ["ORA Error", "Trace File", "Source"]
+WARN_SEARCH_COLUMNS = ["Warning Message", "Trace File", "Source"]
+KILL_SEARCH_COLUMNS = ["SID", "Serial#", "Reason", "Requestor", "Owner", "Source"]
+SEARCH_FIELD_SEP = "\x1f"  # never typed in a query, so no keyword can match across two fields
+
+# Arrow-backed strings make vectorized contains() several times faster
+SEARCH_DTYPE = "string[pyarrow]" if PYARROW_AVAILABLE else object
+
+
+def build_search_text(df, columns):
+    """Lowercased searchable text per row: the given columns joined by SEARCH_FIELD_SEP."""
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=SEARCH_DTYPE)
+    text = _lowered(df[columns[0]])
+    for col in columns[1:]:
+        text = text + SEARCH_FIELD_SEP + _lowered(df[col])
+    return text.astype(SEARCH_DTYPE)
+
+
+def _lowered(values):
+    # Categoricals only need their distinct values lowercased; code -1 (missing) picks the trailing "nan"
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        lowered = values.cat.categories.astype(str).str.lower().to_numpy(dtype=object)
+        return pd.Series(np.append(lowered, "nan").take(values.cat.codes.to_numpy()), index=values.index)
+    return values.astype(str).str.lower()
+
+
+def parse_search_query(query):
+    """
+    Split a keyword query into OR-groups of AND-terms (all lowercased).
+    'a b' and 'a AND b' need both terms, 'a OR b' (or 'a | b') either one,
+    and "quoted phrases" are matched as a whole.
+    """
+    try:
+        tokens = shlex.split(query)
+    except ValueError:  # unbalanced quotes
+        tokens = query.split()
+    groups, current = [], []
+    for token in tokens:
+        if token in ("OR", "|"):
+            if current:
+                groups.append(current)
+            current = []
+        elif token != "AND" and token:
+            current.append(token.lower())
+    if current:
+        groups.append(current)
+    return groups
+
+
+def _regex_contains(values, pattern):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)  # "pattern has match groups"
+        # An inline (?i) keeps pyarrow strings on the Arrow (RE2) kernel; flags= would force
+        # a per-row Python fallback. Patterns RE2 rejects (backreferences, lookaround) take that path.
+        try:
+            return values.str.contains("(?i)" + pattern, regex=True, na=False).astype(bool).to_numpy()
+        except ValueError:
+            return values.str.contains(pattern, regex=True, flags=re.IGNORECASE, na=False).astype(bool).to_numpy()
+
+
+def search_mask(haystack, query, regex=False):
+    """
+    Boolean mask of rows in a lowercased text Series that match `query`.
+    With regex=True the whole query is one case-insensitive regular expression,
+    matched against each SEARCH_FIELD_SEP field on its own so that no match
+    spans two columns (re.error is raised for an invalid pattern).
+    """
+    if regex:
+        re.compile(query)
+        mask = np.zeros(len(haystack), dtype=bool)
+        fields = haystack.str.split(SEARCH_FIELD_SEP, expand=True)
+        for col in fields.columns:
+            mask |= _regex_contains(fields[col], query)
+        return pd.Series(mask, index=haystack.index)
+
+    # Positional copy so later terms only look at rows that are still candidates
+    text = haystack.reset_index(drop=True)
+    mask = np.zeros(len(text), dtype=bool)
+    for group in parse_search_query(query):
+        candidates = text[~mask] if mask.any() else text
+        for term in group:
+            if candidates.empty:
+                break
+            candidates = candidates[candidates.str.contains(term, regex=False, na=False).astype(bool).to_numpy()]
+        mask[candidates.index.to_numpy()] = True
+    return pd.Series(mask, index=haystack.index)
+
+
+
+
+# ---------------- Full-Text Index ----------------
+TOKEN_RE = re.compile(r"[0-9a-z_$#]+")
+
+
+class TextIndex:
+    """
+    Inverted index over every raw line of one log: token -> sorted ids of the
+    TEXT_INDEX_BLOCK_LINES-line blocks it occurs in, plus each block's byte
+    offset. A query term is matched as a substring of the indexed tokens
+    (one scan of the vocabulary), the candidate blocks are intersected, and
+    only those blocks are read back and checked line by line. Timestamp header
+    lines are not indexed (the date filter covers them); their unique
+    fractional seconds would otherwise dominate the vocabulary.
+    """
+
+    def __init__(self, vocabulary, postings, bounds, block_offsets, line_count, block_lines):
+        self.vocabulary = vocabulary  # sorted tokens
+        self.postings = postings  # uint32 block ids; token i owns postings[bounds[i]:bounds[i + 1]]
+        self.bounds = bounds
+        self.block_offsets = block_offsets  # byte offset of each block's first line, then the end of the file
+        self.line_count = line_count
+        self.block_lines = block_lines
+        self._blob = None
+
+    @classmethod
+    def build(cls, source, block_lines=TEXT_INDEX_BLOCK_LINES):
+        blocks = {}
+        block_offsets = []
+        batch = []
+        line_count = 0
+
+        def flush():
+            block = len(block_offsets) - 1
+            text = TIMESTAMP_RE.sub(" ", "\n".join(batch)).lower()
+            for token in set(TOKEN_RE.findall(text)):
+                blocks.setdefault(token, []).append(block)
+            batch.clear()
+
+        for offset, line in iter_alert_log_lines(source, with_offsets=True):
+            if line_count % block_lines == 0:
+                if batch:
+                    flush()
+                block_offsets.append(offset)
+            batch.append(line)
+            line_count += 1
+        if batch:
+            flush()
+        with _open_source(source) as fh:
+            block_offsets.append(fh.seek(0, os.SEEK_END))
+
+        vocabulary = sorted(blocks)
+        sizes = np.fromiter((len(blocks[t]) for t in vocabulary), dtype=np.int64, count=len(vocabulary))
+        bounds = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=bounds[1:])
+        postings = np.fromiter(chain.from_iterable(blocks[t] for t in vocabulary), dtype=np.uint32, count=int(bounds[-1]))
+        return cls(vocabulary, postings, bounds, np.asarray(block_offsets, dtype=np.int64), line_count, block_lines)
+
+    def save(self, fh):
+        np.savez(
+            fh,
+            vocabulary=np.frombuffer("\n".join(self.vocabulary).encode("utf-8"), dtype=np.uint8),
+            postings=self.postings,
+            bounds=self.bounds,
+            block_offsets=self.block_offsets,
+            line_count=np.int64(self.line_count),
+            block_lines=np.int64(self.block_lines),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            text = data["vocabulary"].tobytes().decode("utf-8")
+            return cls(
+                text.split("\n") if text else [],
+                data["postings"],
+                data["bounds"],
+                data["block_offsets"],
+                int(data["line_count"]),
+                int(data["block_lines"]),
+            )
+
+    def _token_blocks(self, token):
+        """Blocks containing a token that has `token` as a substring."""
+        if self._blob is None:
+            self._blob = "\n" + "\n".join(self.vocabulary) + "\n"
+            self._starts = np.cumsum([0] + [len(t) + 1 for t in self.vocabulary])
+        ids, pos = set(), self._blob.find(token)
+        while pos != -1:
+            ids.add(int(np.searchsorted(self._starts, pos, side="right")) - 1)
+            pos = self._blob.find(token, pos + 1)
+        if not ids:
+            return np.empty(0, dtype=np.uint32)
+        return np.unique(np.concatenate([self.postings[self.bounds[i]:self.bounds[i + 1]] for i in ids]))
+
+    def candidate_blocks(self, groups):
+        """Sorted ids of blocks that may hold a line matching parse_search_query() groups."""
+        everything = np.arange(len(self.block_offsets) - 1, dtype=np.uint32)
+        found = np.empty(0, dtype=np.uint32)
+        for group in groups:
+            blocks = everything
+            for term in group:
+                for token in TOKEN_RE.findall(term):
+                    blocks = np.intersect1d(blocks, self._token_blocks(token), assume_unique=True)
+            found = np.union1d(found, blocks)
+        return found
+
+    def search(self, source, query, limit=None):
+        """
+        Yield (line_index, byte_offset, line) for raw lines matching a keyword
+        query (same syntax as search_mask() without regex), at most `limit`.
+        """
+        groups = parse_search_query(query)
+        if not groups:
+            return
+        found = 0
+        with _open_source(source) as fh:
+            for block in self.candidate_blocks(groups):
+                start, end = self.block_offsets[block], self.block_offsets[block + 1]
+                fh.seek(int(start))
+                data = fh.read(int(end - start))
+                for n, (offset, line) in enumerate(decode_lines_with_offsets(data, int(start))):
+                    low = line.lower()
+                    if any(all(term in low for term in group) for group in groups):
+                        yield int(block) * self.block_lines + n, offset, line
+                        found += 1
+                        if limit is not None and found >= limit:
+                            return
+
+# ---------------- Time Index ----------------
+def timestamp_keys(df):
+    """ParsedTimestamp as int64 nanoseconds (NaT is the smallest int64), without copying."""
+    ts = df["ParsedTimestamp"]
+    if not pd.api.types.is_datetime64_any_dtype(ts):
+        ts = pd.to_datetime(ts, utc=True)
+    return ts.array.asi8
+
+
+def sort_by_time(df, search=None):
+    """
+    Stable sort of a frame (and its row-aligned search text) by ParsedTimestamp,
+    rows without a timestamp first. The int64 view of ParsedTimestamp is then
+    ascending, so time_window() can binary-search it. Logs are written in time
+    order, so this is a near-linear merge of already sorted runs.
+    """
+    keys = timestamp_keys(df)
+    if len(keys) < 2 or (keys[1:] >= keys[:-1]).all():
+        return df, search
+    order = np.argsort(keys, kind="stable")
+    df = df.take(order).reset_index(drop=True)
+    if search is not None:
+        search = search.take(order).reset_index(drop=True)
+    return df, search
+
+
+def time_window(df, start, end):
+    """Rows with start <= ParsedTimestamp <= end of a sort_by_time() frame: two binary searches and a slice."""
+    keys = timestamp_keys(df)
+    lo = keys.searchsorted(pd.Timestamp(start).as_unit("ns").value, side="left")
+    hi = keys.searchsorted(pd.Timestamp(end).as_unit("ns").value, side="right")
+    return df.iloc[lo:hi]
+
+
+def time_bounds(df):
+    """(first, last) ParsedTimestamp of a sort_by_time() frame, or None when no row has one."""
+    keys = timestamp_keys(df)
+    first = keys.searchsorted(np.iinfo(np.int64).min, side="right")
+    if first == len(keys):
+        return None
+    ts = df["ParsedTimestamp"]
+    return ts.iloc[first], ts.iloc[-1]
+
+
+def error_frequency(df, hourly=True):
+    """
+    ORA hits per (TimeBucket, ORA Error), with a zero-count row for every code
+    missing from a bucket, so each code's bars line up on the same x values.
+    SampleMinutes lists up to six distinct minutes (hourly) or the day (daily).
+    """
+    base = df[["ParsedTimestamp", "ORA Error"]].dropna(subset=["ParsedTimestamp"])
+    stamps = base["ParsedTimestamp"]
+    # Plain strings: a categorical code column cannot take the zero rows' fill
+    chart = pd.DataFrame({
+        "TimeBucket": stamps.dt.floor("h" if hourly else "D"),
+        "ORA Error": base["ORA Error"].astype(str),
+        "Minute": stamps.dt.strftime("%Y-%m-%d %H:%M" if hourly else "%Y-%m-%d"),
+    })
+    grouped = chart.groupby(["TimeBucket", "ORA Error"])
+    freq = pd.DataFrame({
+        "Count": grouped.size(),
+        "SampleMinutes": grouped["Minute"].agg(lambda s: ", ".join(sorted(set(s))[:6])),
+    })
+    grid = pd.MultiIndex.from_product(
+        [sorted(chart["TimeBucket"].unique()), sorted(chart["ORA Error"].unique())],
+        names=["TimeBucket", "ORA Error"],
+    )
+    freq = freq.reindex(grid)
+    freq["Count"] = freq["Count"].fillna(0).astype("int64")
+    freq["SampleMinutes"] = freq["SampleMinutes"].fillna("")
+    return freq.reset_index()
+
+
+def events_frame(event_list):
+    """Instance events (dicts with Timestamp/Line) as a frame sorted by ParsedTimestamp."""
+    df = pd.DataFrame(event_list, columns=["Timestamp", "Line", "Index"])
+    df["ParsedTimestamp"] = parse_timestamp_series(df["Timestamp"])
+    return sort_by_time(df)[0]
+
+# ---------------- Compare ----------------
+# Masks applied to a hit's raw line so the same error from another run (or another day) gets the same signature
+SIGNATURE_MASKS = [
+    (r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?", "<TS>"),
+    (r"\b(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun) +[A-Z][a-z]{2} +\d{1,2} +\d{2}:\d{2}:\d{2}(?: +\d{4})?", "<TS>"),
+    (r"\b0x[0-9a-fA-F]+\b", "<HEX>"),
+    (r"\d+", "#"),
+]
+COMPARE_BUCKET = "h"
+
+
+def error_signatures(df, code_column="ORA Error", text_column="Raw Line"):
+    """
+    Normalized signature per row: error code + raw line with timestamps, hex values
+    and numbers masked. Each distinct raw line is normalized only once.
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    codes, uniques = pd.factorize(df[text_column])
+    # Missing text has code -1, which picks the trailing ""
+    masked = pd.Series(np.append(np.asarray(uniques, dtype=object), ""), dtype=object)
+    for pattern, token in SIGNATURE_MASKS:
+        masked = masked.str.replace(pattern, token, regex=True)
+    masked = masked.str.strip().to_numpy(dtype=object)
+    return df[code_column].astype(str) + " | " + pd.Series(masked.take(codes), index=df.index)
+
+
+def _count_delta(a, b, label):
+    counts = pd.concat([a.rename("Count_A"), b.rename("Count_B")], axis=1).fillna(0).astype(int)
+    counts["Delta"] = counts["Count_B"] - counts["Count_A"]
+    counts.index.name = label
+    return counts.sort_index().reset_index()
+
+
+def _signature_summary(df, signatures, only):
+    """One row per signature in `only`: count, first/last time seen and an example line."""
+    rows = df.assign(Signature=signatures)[signatures.isin(only).to_numpy()]
+    if rows.empty:
+        return pd.DataFrame(columns=["ORA Error", "Signature", "Count", "First Seen", "Last Seen", "Example"])
+    summary = rows.groupby("Signature", sort=False).agg(**{
+        "ORA Error": ("ORA Error", "first"),
+        "Count": ("ORA Error", "size"),
+        "First Seen": ("ParsedTimestamp", "min"),
+        "Last Seen": ("ParsedTimestamp", "max"),
+        "Example": ("Raw Line", "first"),
+    })
+    summary = summary.reset_index()[["ORA Error", "Signature", "Count", "First Seen", "Last Seen", "Example"]]
+    return summary.sort_values(["Count", "ORA Error"], ascending=[False, True], ignore_index=True)
+
+
+def compare_two_parsed_lists(list_a, list_b, bucket=COMPARE_BUCKET):
+    """
+    Compare the ORA error hits of two parsed logs (DataFrames from the parse
+    cache, or lists of hit dicts). Rows are matched on error_signatures() with
+    hash joins, so the cost is linear in the number of rows.
+
+    Returns:
+        {
+            "counts": Count_A / Count_B / Delta per ORA code,
+            "buckets": Count_A / Count_B / Delta per time bucket (default: hour),
+            "new_in_b": signatures that only occur in B,
+            "new_in_a": signatures that only occur in A
+        }
+    """
+    frames = []
+    for rows in (list_a, list_b):
+        df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows), columns=None if rows else ORA_COLUMNS)
+        if "ParsedTimestamp" not in df.columns:
+            df = df.assign(ParsedTimestamp=parse_timestamp_series(df["Timestamp"]))
+        frames.append(df)
+    df_a, df_b = frames
+
+    counts = _count_delta(observed_counts(df_a["ORA Error"]), observed_counts(df_b["ORA Error"]), "ORA Error")
+    buckets = _count_delta(
+        df_a["ParsedTimestamp"].dropna().dt.floor(bucket).value_counts(),
+        df_b["ParsedTimestamp"].dropna().dt.floor(bucket).value_counts(),
+        "Time Bucket",
+    )
+
+    sig_a, sig_b = error_signatures(df_a), error_signatures(df_b)
+    keys_a, keys_b = pd.Index(sig_a.unique()), pd.Index(sig_b.unique())
+    return {
+        "counts": counts,
+        "buckets": buckets,
+        "new_in_b": _signature_summary(df_b, sig_b, keys_b.difference(keys_a, sort=False)),
+        "new_in_a": _signature_summary(df_a, sig_a, keys_a.difference(keys_b, sort=False)),
+    }
+
+
+# ---------------- Parallel Parsing ----------------
+def _worker_context():
+    """
+    Streamlit registers the running script as __main__, and spawn/forkserver children
+    re-execute __main__ on start-up, so fork wherever the platform offers it.
+    """
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def parse_alert_log_bytes(data, source_name):
+    """Worker entry point: parse one file's raw bytes (or a file path) into a cache entry."""
+    if isinstance(data, (str, os.PathLike)):
+        return parse_alert_log_file(data, source_name)
+    return parse_alert_log_file(io.BytesIO(data), source_name)
+
+
+def parse_files_parallel(files, max_workers=None, progress=None):
+    """
+    Parse several files in a process pool.
+
+    files: list of (source_name, raw_bytes or file path).
+    progress: optional callback(done, total, source_name), called from the
+        calling thread as each file finishes (in completion order).
+    Returns the parsed entries in the same order as `files`.
+    """
+    results = [None] * len(files)
+    if not files:
+        return results
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(files)))
+    ctx = _worker_context()
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx) as pool:
+        futures = {
+            pool.submit(parse_alert_log_bytes, data, name): idx
+            for idx, (name, data) in enumerate(files)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            idx = futures[future]
+            results[idx] = future.result()
+            if progress:
+                progress(done, len(files), files[idx][0])
+    return results
+
+
+# ---------------- Chunked Parsing (one large file) ----------------
+# Placeholder timestamp for hits ahead of a chunk's first timestamp line; replaced
+# with the previous chunk's last timestamp when the chunks are stitched together.
+_CARRIED_TIMESTAMP = "\x00carried-timestamp"
+
+
+_NEWLINE_RE = re.compile(b"\n")
+
+
+def _find_newline(buf, pos):
+    """buf.find(b"\n", pos) that also works on a memoryview (which has no find())."""
+    m = _NEWLINE_RE.search(buf, pos)
+    return -1 if m is None else m.start()
+
+
+def _skip_lines(buf, pos, count):
+    """Offset just past the `count` lines starting at pos (or the end of buf)."""
+    for _ in range(count):
+        if pos >= len(buf):
+            break
+        nl = _find_newline(buf, pos)
+        pos = len(buf) if nl == -1 else nl + 1
+    return pos
+
+
+def split_line_ranges(buf, chunk_bytes=CHUNK_TARGET_BYTES, context_lines=LOOKAHEAD_LINES):
+    """
+    Split a bytes/mmap/memoryview buffer into (start, end, context_end) ranges
+    of about chunk_bytes each. Every end falls right after a newline, and
+    context_end covers the following context_lines lines for lookahead.
+    """
+    size = len(buf)
+    ranges = []
+    start = 0
+    while start < size:
+        nl = _find_newline(buf, start + chunk_bytes - 1) if start + chunk_bytes < size else -1
+        end = size if nl == -1 else nl + 1
+        ranges.append((start, end, _skip_lines(buf, end, context_lines)))
+        start = end
+    return ranges
+
+
+def _read_range(source, start, stop):
+    if isinstance(source, (bytes, bytearray)):
+        return source[start:stop]
+    if isinstance(source, memoryview):
+        return source[start:stop].tobytes()
+    with open(source, "rb") as fh:
+        fh.seek(start)
+        return fh.read(stop - start)
+
+
+def scan_chunk(source, start, end, context_end, source_name, first=False, base_offset=None):
+    """
+    Worker entry point: scan bytes [start, end) of a file, reading on to context_end for lookahead.
+    base_offset is the file offset of `start` (defaults to start; differs when source is a slice).
+    """
+    data = _read_range(source, start, context_end)
+    own, offsets = unzip_offsets(decode_lines_with_offsets(data[:end - start], start if base_offset is None else base_offset))
+    own = list(own)
+    context = data[end - start:].decode("utf-8", errors="ignore").splitlines()
+    return scan_alert_log(
+        chain(own, context),
+        source_name=source_name,
+        initial_timestamp=None if first else _CARRIED_TIMESTAMP,
+        limit=len(own),
+        offsets=offsets,
+    )
+
+
+def _fill_carried_timestamps(timestamps, timestamp):
+    # Placeholder values are always the leading ones
+    for k, value in enumerate(timestamps):
+        if value != _CARRIED_TIMESTAMP:
+            break
+        timestamps[k] = timestamp
+
+
+class ChunkMerger:
+    """
+    Stitches per-chunk scan_alert_log() results together as they arrive (in
+    file order). add() also fixes up each result's own hit tables and events
+    (carried timestamps, file-wide Line Index), so a chunk can be shown on
+    its own before the whole file is done.
+    """
+
+    def __init__(self):
+        self.merged = {
+            "ora": hit_table(ORA_COLUMNS),
+            "warnings": hit_table(WARN_COLUMNS),
+            "kill_sessions": hit_table(KILL_COLUMNS),
+            "info": merge_instance_info([]),
+            "trace_index": TraceIndex(),
+            "last_timestamp": None,
+            "line_count": 0,
+        }
+        self._names = {k: set() for k in INSTANCE_SET_KEYS}
+        self._carry = None
+
+    def add(self, res):
+        merged = self.merged
+        offset = merged["line_count"]
+        fill = self._carry or "Not Found"
+        for key in ("ora", "warnings", "kill_sessions"):
+            table = res[key]
+            _fill_carried_timestamps(table["Timestamp"], fill)
+            table["Line Index"] = [i + offset for i in table["Line Index"]]
+            for col, values in table.items():
+                merged[key][col].extend(values)
+        for k in INSTANCE_SET_KEYS:
+            self._names[k].update(res["info"][k])
+        for k in INSTANCE_EVENT_KEYS:
+            for event in res["info"][k]:
+                if event["Timestamp"] == _CARRIED_TIMESTAMP:
+                    event["Timestamp"] = fill
+                event["Index"] += offset
+            merged["info"][k].extend(res["info"][k])
+        merged["trace_index"].extend(res["trace_index"], offset)
+        merged["line_count"] += res["line_count"]
+        if res["last_timestamp"] not in (None, _CARRIED_TIMESTAMP):
+            self._carry = res["last_timestamp"]
+
+    def result(self):
+        """The merged scan result; call once, after the last add()."""
+        for k in INSTANCE_SET_KEYS:
+            self.merged["info"][k] = sorted(self._names[k])
+        self.merged["last_timestamp"] = self._carry
+        return self.merged
+
+
+def merge_chunk_results(results):
+    """Stitch per-chunk scan_alert_log() results (in file order) into one result."""
+    merger = ChunkMerger()
+    for res in results:
+        merger.add(res)
+    return merger.result()
+
+
+def parse_alert_log_chunked(source, source_name, max_workers=None, chunk_bytes=CHUNK_TARGET_BYTES, progress=None):
+    """
+    Parse one large file (path or raw bytes) by splitting it at line boundaries
+    and scanning the byte ranges in a process pool. The result matches
+    parse_alert_log_file() exactly. Ranges are sliced and submitted lazily, at
+    most 2 * max_workers at a time, so raw bytes are never copied out in full.
+
+    progress: optional callback(done, total, source_name) per finished chunk.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if os.path.getsize(path) == 0:
+            return parse_alert_log_file(path, source_name)
+        with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            ranges = split_line_ranges(buf, chunk_bytes)
+        jobs = ((path, start, end, context_end, start) for start, end, context_end in ranges)
+    else:
+        data = bytes(source)
+        ranges = split_line_ranges(data, chunk_bytes)
+        jobs = ((data[start:context_end], 0, end - start, context_end - start, start)
+                for start, end, context_end in ranges)
+
+    results = [None] * len(ranges)
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(ranges) or 1))
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=_worker_context()) as pool:
+        in_flight = {}
+        done = 0
+
+        def collect():
+            nonlocal done
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                results[in_flight.pop(future)] = future.result()
+                done += 1
+                if progress:
+                    progress(done, len(ranges), source_name)
+
+        for idx, (src, start, end, context_end, base) in enumerate(jobs):
+            if len(in_flight) >= 2 * max_workers:
+                collect()
+            in_flight[pool.submit(scan_chunk, src, start, end, context_end, source_name, idx == 0, base)] = idx
+        while in_flight:
+            collect()
+
+    return finalize_entry(merge_chunk_results(results))
+
+
+# ---------------- Background Parsing ----------------
+def _chunk_entry(res):
+    """Frames, search text and instance info of one ChunkMerger-fixed chunk result."""
+    entry = finalize_entry({key: res[key] for key in ("ora", "warnings", "kill_sessions")})
+    entry["info"] = res["info"]
+    return entry
+
+
+def _partial_entry(chunks):
+    """One entry (frames, search text, info) from the finished chunks of a file so far."""
+    return {
+        "df_ora": concat_frames([c["df_ora"] for c in chunks]),
+        "df_warn": concat_frames([c["df_warn"] for c in chunks]),
+        "df_kill": concat_frames([c["df_kill"] for c in chunks]),
+        "search": {
+            key: pd.concat([c["search"][key] for c in chunks], ignore_index=True)
+            for key in ("ora", "warnings", "kill_sessions")
+        },
+        "info": merge_instance_info([c["info"] for c in chunks]),
+        "partial": True,
+    }
+
+
+class BackgroundParse:
+    """
+    Parses (source_name, bytes or memoryview) pairs on a daemon thread, chunk_bytes at a
+    time (scan_chunk() in a process pool when workers > 1), and publishes as
+    it goes: bytes_done / total_bytes, rows found, eta(), finished entries
+    in `entries` and snapshot() of everything parsed so far, both keyed by
+    the file's position in `files` (names may repeat). `version` goes up
+    with every published chunk. Finished entries match
+    parse_alert_log_file() exactly.
+
+    cancel() only raises a flag: the thread stops after the chunk in flight
+    and then drops the input and every result itself.
+    """
+
+    def __init__(self, files, workers=1, chunk_bytes=BACKGROUND_CHUNK_BYTES):
+        self.names = [name for name, _ in files]
+        self.total_bytes = sum(len(data) for _, data in files)
+        self.bytes_done = 0
+        self.rows = 0
+        self.version = 0
+        self.entries = {}
+        self.error = None
+        self.started = time.time()
+        self._files = list(files)
+        self._workers = max(1, workers or 1)
+        self._chunk_bytes = chunk_bytes
+        self._chunks = {}
+        self._snapshot = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="alert-log-parse", daemon=True)
+        self._thread.start()
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def eta(self):
+        """Seconds left at the rate so far, or None before the first chunk."""
+        if not self.bytes_done:
+            return None
+        return (time.time() - self.started) * (self.total_bytes - self.bytes_done) / self.bytes_done
+
+    def cancel(self):
+        self._cancel.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+        return self.done
+
+    def snapshot(self):
+        """File position -> finished entry, or a partial one (entry["partial"]) for the file in progress."""
+        with self._lock:
+            if self._snapshot is None or self._snapshot[0] != self.version:
+                out = dict(self.entries)
+                for idx, chunks in self._chunks.items():
+                    if chunks:
+                        out[idx] = _partial_entry(chunks)
+                self._snapshot = (self.version, out)
+            return self._snapshot[1]
+
+    def _scan(self, name, data, pool):
+        """Yield (scan result, bytes covered) for each range of data, in order."""
+        ranges = split_line_ranges(data, self._chunk_bytes)
+        # Each range is copied once (bytes of a memoryview slice), for this thread or a worker process
+        jobs = ((bytes(data[start:context_end]), 0, end - start, context_end - start, start, idx == 0, end - start)
+                for idx, (start, end, context_end) in enumerate(ranges))
+        if pool is None:
+            for src, start, end, context_end, base, first, size in jobs:
+                yield scan_chunk(src, start, end, context_end, name, first, base), size
+            return
+        # Keep only a few ranges in flight, so the pool never holds a copy of the whole file
+        in_flight = deque()
+        for src, start, end, context_end, base, first, size in jobs:
+            in_flight.append((pool.submit(scan_chunk, src, start, end, context_end, name, first, base), size))
+            if len(in_flight) >= 2 * self._workers:
+                future, size = in_flight.popleft()
+                yield future.result(), size
+        while in_flight:
+            future, size = in_flight.popleft()
+            yield future.result(), size
+
+    def _run(self):
+        pool = None
+        try:
+            if self._workers > 1:
+                pool = ProcessPoolExecutor(max_workers=self._workers, mp_context=_worker_context())
+            for idx, name in enumerate(self.names):
+                if self.cancelled:
+                    break
+                with self._lock:
+                    data = self._files[idx][1]
+                    self._chunks[idx] = []
+                merger = ChunkMerger()
+                for res, size in self._scan(name, data, pool):
+                    if self.cancelled:
+                        break
+                    merger.add(res)
+                    chunk = _chunk_entry(res)
+                    with self._lock:
+                        if self.cancelled:
+                            break
+                        self._chunks[idx].append(chunk)
+                        self.bytes_done += size
+                        self.rows += len(chunk["df_ora"]) + len(chunk["df_warn"]) + len(chunk["df_kill"])
+                        self.version += 1
+                data = None
+                if self.cancelled:
+                    break
+                entry = finalize_entry(merger.result())
+                with self._lock:
+                    if self.cancelled:
+                        break
+                    self.entries[idx] = entry
+                    del self._chunks[idx]
+                    self._files[idx] = (name, None)
+                    self.version += 1
+        except Exception as e:  # surfaced to the dashboard through .error
+            self.error = e
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            if self.cancelled:
+                with self._lock:
+                    self._files = []
+                    self._chunks.clear()
+                    self.entries.clear()
+                    self._snapshot = None
+
+
+# ---------------- Time-Range Pre-Seek (chronological local files) ----------------
+_TIMESTAMP_BYTES_RE = re.compile(TIMESTAMP_RE.pattern.encode())
+
+
+def _next_timestamp_line(buf, pos, stop):
+    """(line offset, Timestamp) of the first timestamp line starting in [pos, stop), or None."""
+    if pos > 0:
+        pos = buf.find(b"\n", pos - 1) + 1  # snap to a line start
+        if pos == 0:
+            return None
+    while pos < stop:
+        window_end = min(len(buf), pos + SEEK_PROBE_BYTES)
+        m = _TIMESTAMP_BYTES_RE.search(buf, pos, window_end)
+        if m is not None:
+            line_start = buf.rfind(b"\n", 0, m.start()) + 1
+            if line_start >= stop:
+                return None
+            return line_start, pd.Timestamp(m.group(1).decode())
+        if window_end >= len(buf):
+            return None
+        pos = window_end - 64  # a timestamp may straddle the probe window
+    return None
+
+
+def seek_timestamp(buf, target, after=False):
+    """
+    Byte offset of the first timestamp line stamped at or after `target`
+    (strictly after with after=True) in a chronological log, or len(buf).
+    Binary search over byte positions: each probe reads forward from the
+    midpoint to the next TIMESTAMP_RE line, so a seek costs a few dozen
+    small reads however large the file is.
+    """
+    target = pd.Timestamp(target)
+
+    def past(ts):
+        return ts > target if after else ts >= target
+
+    # The answer is always in [lo, best]; nothing in [hi, best) is a timestamp line
+    lo, hi, best = 0, len(buf), len(buf)
+    while hi - lo > SEEK_PROBE_BYTES:
+        mid = (lo + hi) // 2
+        found = _next_timestamp_line(buf, mid, hi)
+        if found is None:
+            hi = mid
+        elif past(found[1]):
+            best = hi = found[0]
+        else:
+            lo = found[0] + 1
+    while True:
+        found = _next_timestamp_line(buf, lo, best)
+        if found is None:
+            return best
+        if past(found[1]):
+            return found[0]
+        lo = found[0] + 1
+
+
+def find_time_range(buf, start, end):
+    """
+    (start_offset, end_offset) of the lines stamped between start and end
+    (inclusive): from the first timestamp line >= start up to the first one > end.
+    None leaves that side open.
+    """
+    lo = 0 if start is None else seek_timestamp(buf, start)
+    hi = len(buf) if end is None else seek_timestamp(buf, end, after=True)
+    return lo, max(lo, hi)
+
+
+def parse_alert_log_window(path, source_name, start, end, margin_lines=LOOKAHEAD_LINES):
+    """
+    Parse only the part of a chronological local alert log stamped between
+    start and end. The file is memory-mapped and the window found with
+    find_time_range(); only the window plus margin_lines of lookahead is read
+    and scanned. Byte Offset stays file-absolute; Line Index counts from the
+    start of the window. entry["window"] holds the (start, end) byte offsets.
+    """
+    path = os.fspath(path)
+    if os.path.getsize(path) == 0:
+        entry = parse_alert_log_file(path, source_name)
+        entry["window"] = (0, 0)
+        return entry
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        lo, hi = find_time_range(buf, start, end)
+        context_end = _skip_lines(buf, hi, margin_lines)
+    entry = finalize_entry(scan_chunk(path, lo, hi, context_end, source_name, first=True))
+    entry["window"] = (lo, hi)
+    return entry
+
+
+# ---------------- Quick Look (sampled preview) ----------------
+PREVIEW_COUNT_KEYS = {"ora": "ORA Errors", "warnings": "Warnings", "kill_sessions": "Kill Sessions"}
+
+
+def _source_size(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return len(source)
+    return getattr(source, "size", None) or len(source.getbuffer())
+
+
+def _read_sample(source, start, stop):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[start:stop])
+    with _open_source(source) as fh:
+        fh.seek(start)
+        return fh.read(stop - start)
+
+
+def preview_ranges(size, samples=PREVIEW_SAMPLES, sample_bytes=PREVIEW_SAMPLE_BYTES):
+    """(start, stop) byte ranges of a quick look: the head, `samples` evenly spaced ranges and the tail."""
+    if size <= (samples + 2) * sample_bytes:
+        return [(0, size)]
+    step = (size - sample_bytes) / (samples + 1)
+    return [(int(k * step), int(k * step) + sample_bytes) for k in range(samples + 2)]
+
+
+def preview_alert_log(source, source_name, samples=PREVIEW_SAMPLES, sample_bytes=PREVIEW_SAMPLE_BYTES):
+    """
+    Quick look at an upload buffer, bytes or file path from a few byte ranges
+    (see preview_ranges()), each scanned with scan_alert_log() from its first
+    whole line. Counts are scaled up by file size / bytes sampled, so they are
+    estimates unless "exact" is set (the ranges covered the whole file).
+    The time span runs from the first timestamp of the head to the last one
+    of the tail.
+    """
+    size = _source_size(source)
+    ranges = preview_ranges(size, samples, sample_bytes)
+    sampled = 0
+    counts = Counter()
+    codes = Counter()
+    names = {k: set() for k in INSTANCE_SET_KEYS}
+    first_ts = last_ts = None
+    for start, stop in ranges:
+        data = _read_sample(source, start, stop)
+        if start > 0:
+            data = data[data.find(b"\n") + 1:]  # starts mid-line
+        if stop < size:
+            data = data[:data.rfind(b"\n") + 1]  # ends mid-line
+        sampled += len(data)
+        text = data.decode("utf-8", errors="ignore")
+        res = scan_alert_log(text.splitlines(), source_name=source_name)
+        for key in PREVIEW_COUNT_KEYS:
+            counts[key] += hit_count(res[key])
+        codes.update(res["ora"]["ORA Error"])
+        for k in INSTANCE_SET_KEYS:
+            names[k].update(res["info"][k])
+        if first_ts is None:
+            m = TIMESTAMP_RE.search(text)
+            first_ts = m.group(1) if m else None
+        if stop == size:
+            last_ts = res["last_timestamp"]
+    exact = len(ranges) == 1
+    scale = 1.0 if exact or not sampled else size / sampled
+    preview = {
+        "Source": source_name,
+        "size": size,
+        "sampled_bytes": sampled,
+        "exact": exact,
+        "counts": {key: round(counts[key] * scale) for key in PREVIEW_COUNT_KEYS},
+        "ora_codes": codes,
+        "first_timestamp": parse_iso_timestamp(first_ts),
+        "last_timestamp": parse_iso_timestamp(last_ts),
+    }
+    preview.update({k: sorted(v) for k, v in names.items()})
+    return preview
+
+
+def merge_previews(previews):
+    """Combine per-file preview_alert_log() results into one (same keys, Source = file count)."""
+    firsts = [p["first_timestamp"] for p in previews if p["first_timestamp"] is not None]
+    lasts = [p["last_timestamp"] for p in previews if p["last_timestamp"] is not None]
+    merged = {
+        "Source": len(previews),
+        "size": sum(p["size"] for p in previews),
+        "sampled_bytes": sum(p["sampled_bytes"] for p in previews),
+        "exact": all(p["exact"] for p in previews),
+        "counts": {key: sum(p["counts"][key] for p in previews) for key in PREVIEW_COUNT_KEYS},
+        "ora_codes": sum((p["ora_codes"] for p in previews), Counter()),
+        "first_timestamp": min(firsts) if firsts else None,
+        "last_timestamp": max(lasts) if lasts else None,
+    }
+    merged.update({k: sorted(set().union(*(p[k] for p in previews))) for k in INSTANCE_SET_KEYS})
+    return merged
+
+
+# ---------------- Follow Mode (live local logs) ----------------
+FOLLOW_FINGERPRINT_BYTES = 4096  # leading bytes compared to notice a file replaced in place
+
+
+def _shift_lines(result, offset):
+    """Move a scan_alert_log() result that started at line 0 to start at line `offset`."""
+    if not offset:
+        return result
+    for key in ("ora", "warnings", "kill_sessions"):
+        result[key]["Line Index"] = [i + offset for i in result[key]["Line Index"]]
+    for k in INSTANCE_EVENT_KEYS:
+        for event in result["info"][k]:
+            event["Index"] += offset
+    result["trace_index"].positions = [p + offset for p in result["trace_index"].positions]
+    return result
+
+
+def join_entries(entries):
+    """finalize_entry() results for consecutive parts of one file, joined into one entry."""
+    if len(entries) == 1:
+        return entries[0]
+    trace_index = TraceIndex()
+    for entry in entries:
+        trace_index.extend(entry["trace_index"])
+    return {
+        "df_ora": concat_frames([entry["df_ora"] for entry in entries]),
+        "df_warn": concat_frames([entry["df_warn"] for entry in entries]),
+        "df_kill": concat_frames([entry["df_kill"] for entry in entries]),
+        "search": {k: pd.concat([entry["search"][k] for entry in entries], ignore_index=True) for k in entries[0]["search"]},
+        "info": merge_instance_info([entry["info"] for entry in entries]),
+        "trace_index": trace_index,
+        "last_timestamp": next((entry["last_timestamp"] for entry in reversed(entries) if entry["last_timestamp"]), None),
+        "line_count": sum(entry["line_count"] for entry in entries),
+    }
+
+
+def _has_rows(entry):
+    return any(not entry[k].empty for k in ("df_ora", "df_warn", "df_kill")) or len(entry["trace_index"]) > 0 or \
+        any(entry["info"][k] for k in INSTANCE_EVENT_KEYS + INSTANCE_SET_KEYS)
+
+
+class FollowedLog:
+    """
+    A log file on the local filesystem that is still being written to.
+    refresh() only reads the bytes appended since the previous call and
+    parses them into a new part, so a refresh costs as much as the new data.
+    Committed parts are merged pairwise once the older one is no more than
+    twice the size of the newer one (each row is copied O(log n) times), and
+    the last LOOKAHEAD_LINES lines are kept apart as a provisional tail that
+    is re-read on the next refresh, since their kill-session blocks / trace
+    files may be incomplete. `entry` joins the parts on first use after a
+    change; while the file is unchanged it stays the same object.
+    A different file at the path (rotation) or a shorter one (truncation)
+    restarts from the beginning.
+    """
+
+    def __init__(self, path, source_name=None):
+        self.path = os.fspath(path)
+        self.source_name = source_name or self.path
+        self.rotations = 0
+        self.reset()
+
+    def reset(self):
+        self.offset = 0  # file offset right after the last committed line
+        self.seen = 0  # file offset right after the last complete line read
+        self.file_id = None  # (st_dev, st_ino) of the file being followed
+        self.size = 0  # file size at the last refresh
+        self.mtime = None  # st_mtime_ns at the last refresh
+        self.head = b""  # first committed bytes, to notice a file replaced in place
+        self.parts = [finalize_entry(scan_alert_log([], source_name=self.source_name))]
+        self.line_count = 0  # lines in the committed parts
+        self.last_timestamp = None  # last timestamp of the committed parts
+        self.tail = None  # provisional entry for the last LOOKAHEAD_LINES lines
+        self._entry = None
+
+    @property
+    def entry(self):
+        """The whole file as one entry: the committed parts and the provisional tail."""
+        if self._entry is None:
+            tail = self.tail
+            if tail is None:
+                self._entry = join_entries(self.parts)
+            elif _has_rows(tail):
+                self._entry = join_entries(self.parts + [tail])
+            else:
+                self._entry = dict(join_entries(self.parts), last_timestamp=tail["last_timestamp"],
+                                   line_count=self.line_count + tail["line_count"])
+        return self._entry
+
+    def _commit(self, part):
+        self.parts.append(part)
+        while len(self.parts) > 1 and self.parts[-2]["line_count"] <= 2 * self.parts[-1]["line_count"]:
+            newer = self.parts.pop()
+            self.parts[-1] = join_entries([self.parts[-1], newer])
+        self.line_count += part["line_count"]
+        self.last_timestamp = part["last_timestamp"] or self.last_timestamp
+
+    def _replaced(self, stat):
+        if self.file_id is None:
+            return False
+        if (stat.st_dev, stat.st_ino) != self.file_id or stat.st_size < self.offset:
+            return True
+        return bool(self.head) and _read_range(self.path, 0, len(self.head)) != self.head
+
+    def _unchanged(self, stat):
+        return (stat.st_dev, stat.st_ino) == self.file_id and stat.st_size == self.size and stat.st_mtime_ns == self.mtime
+
+    def changed(self):
+        """Cheap check (one stat) for whether refresh() has anything to do."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return not self._unchanged(stat)
+
+    def refresh(self):
+        """
+        Parse whatever was appended since the last refresh.
+        Returns the number of new bytes read; self.entry holds the full result.
+        """
+        stat = os.stat(self.path)
+        if self._replaced(stat):
+            self.reset()
+            self.rotations += 1
+        elif self._unchanged(stat):
+            return 0
+        self.file_id = (stat.st_dev, stat.st_ino)
+        self.size = stat.st_size
+        self.mtime = stat.st_mtime_ns
+
+        data = _read_range(self.path, self.offset, stat.st_size)
+        eof = data.rfind(b"\n") + 1  # a partial last line waits until it is complete
+        if self.offset + eof == self.seen:
+            return 0  # no new complete line
+
+        # Commit all but the last LOOKAHEAD_LINES lines; those only serve as lookahead for now
+        boundary = eof
+        for _ in range(LOOKAHEAD_LINES):
+            if boundary == 0:
+                break
+            boundary = data.rfind(b"\n", 0, boundary - 1) + 1
+
+        if boundary:
+            own, offsets = unzip_offsets(decode_lines_with_offsets(data[:boundary], self.offset))
+            own = list(own)
+            context = data[boundary:eof].decode("utf-8", errors="ignore").splitlines()
+            result = scan_alert_log(
+                chain(own, context),
+                source_name=self.source_name,
+                initial_timestamp=self.last_timestamp,
+                limit=len(own),
+                offsets=offsets,
+            )
+            self._commit(finalize_entry(_shift_lines(result, self.line_count)))
+            self.offset += boundary
+            if len(self.head) < FOLLOW_FINGERPRINT_BYTES:
+                self.head = _read_range(self.path, 0, min(self.offset, FOLLOW_FINGERPRINT_BYTES))
+
+        lines, offsets = unzip_offsets(decode_lines_with_offsets(data[boundary:eof], self.offset))
+        tail = scan_alert_log(
+            lines,
+            source_name=self.source_name,
+            initial_timestamp=self.last_timestamp,
+            offsets=offsets,
+        )
+        self.tail = finalize_entry(_shift_lines(tail, self.line_count))
+        self._entry = None
+
+        new_bytes = max(0, self.offset - boundary + eof - self.seen)
+        self.seen = self.offset - boundary + eof
+        return new_bytes
+
+
+# ---------------- Fleet Scan ----------------
+DEFAULT_LOG_PATTERNS = ["*.log", "*.txt"]  # same file types the dashboard accepts
+FLEET_LOG_PATTERNS = ["alert_*.log"]
+ALERT_FILE_RE = re.compile(r"^alert_(.+?)\.log$", re.I)  # alert_<SID>.log
+FLEET_COLUMNS = [
+    "Host", "Instance", "Files", "Oracle Release", "ORA Errors", "Unique ORA Codes", "Top ORA Error",
+    "Warnings", "Kill Sessions", "Crash Events", "Last Crash", "Last Startup", "Last Entry",
+]
+
+
+def discover_logs(paths, patterns=DEFAULT_LOG_PATTERNS, recursive=True):
+    """
+    Files named in `paths`, plus every file under a directory in `paths` whose
+    name matches one of `patterns`. In walk order, without duplicates.
+    Raises FileNotFoundError for a path that doesn't exist.
+    """
+    found = []
+    for path in paths:
+        path = os.path.expanduser(path)
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        if not os.path.isdir(path):
+            raise FileNotFoundError(path)
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            found.extend(
+                os.path.join(root, name) for name in sorted(files)
+                if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+            )
+            if not recursive:
+                break
+    return list(dict.fromkeys(found))
+
+
+def source_name_for(path, roots):
+    """Name for the Source column: path relative to the directory it was found under."""
+    path = os.path.abspath(path)
+    for root in roots:
+        root = os.path.abspath(os.path.expanduser(root))
+        if os.path.isdir(root) and os.path.commonpath([root, path]) == root:
+            return os.path.relpath(path, root)
+    return os.path.basename(path)
+
+
+def parse_logs(files, workers=None, cache=None, progress=None, chunked_min_mb=CHUNKED_PARSE_MIN_MB, window=None):
+    """
+    Parse (source_name, path) pairs with at most `workers` processes. Files found
+    in `cache` (a DiskParseCache) are loaded instead of parsed, and new results
+    are stored there. Files over chunked_min_mb are split across the workers.
+
+    window: optional (start, end) Timestamps; each file is then read only
+    between those times with parse_alert_log_window() and the cache is skipped.
+    progress: optional callback(source_name) per finished file.
+    Returns the entries in the same order as `files`.
+    """
+    if window is not None:
+        entries = []
+        for name, path in files:
+            entries.append(parse_alert_log_window(path, name, *window))
+            if progress:
+                progress(name)
+        return entries
+
+    entries = [None] * len(files)
+    keys = [None] * len(files)
+    todo = []
+    use_cache = cache is not None and cache.enabled
+    for idx, (name, path) in enumerate(files):
+        if use_cache:
+            keys[idx] = cache.file_key(path, name)
+            entries[idx] = cache.get(keys[idx])
+            if entries[idx] is not None and progress:
+                progress(name)
+        if entries[idx] is None:
+            todo.append(idx)
+
+    workers = max(1, workers or os.cpu_count() or 1)
+    large = [i for i in todo if workers > 1 and os.path.getsize(files[i][1]) >= chunked_min_mb * 1024 * 1024]
+    rest = [i for i in todo if i not in large]
+    for i in large:
+        name, path = files[i]
+        entries[i] = parse_alert_log_chunked(path, name, max_workers=workers)
+        if progress:
+            progress(name)
+    if workers > 1 and len(rest) > 1:
+        report = (lambda done, total, name: progress(name)) if progress else None
+        parsed = parse_files_parallel([files[i] for i in rest], max_workers=workers, progress=report)
+    else:
+        parsed = []
+        for i in rest:
+            parsed.append(parse_alert_log_file(files[i][1], files[i][0]))
+            if progress:
+                progress(files[i][0])
+    for i, entry in zip(rest, parsed):
+        entries[i] = entry
+
+    if use_cache:
+        for i in todo:
+            cache.put(keys[i], entries[i])
+        cache.save_file_keys()
+    return entries
+
+
+def _latest(events):
+    stamps = parse_timestamp_series(pd.Series([e["Timestamp"] for e in events], dtype=object))
+    return stamps.max() if stamps.notna().any() else pd.NaT
+
+
+def fleet_summary(entries, names):
+    """
+    One row per host/instance (from detect_instance_summary_and_events(), or the
+    alert_<SID>.log file name when the log never names its instance) with ORA,
+    warning, kill-session and crash counts and the last startup / crash times.
+    """
+    rows = []
+    for entry, name in zip(entries, names):
+        info = entry["info"]
+        file_sid = ALERT_FILE_RE.match(os.path.basename(name))
+        ora = entry["df_ora"]
+        last_entry = pd.concat([entry[k]["ParsedTimestamp"] for k in ("df_ora", "df_warn", "df_kill")]).max()
+        rows.append({
+            "Host": ", ".join(info["Hostnames"]) or "Unknown",
+            "Instance": ", ".join(info["Instance Names"]) or (file_sid.group(1) if file_sid else name),
+            "Files": 1,
+            "Oracle Release": ", ".join(info["Oracle Releases"]),
+            "ORA Errors": len(ora),
+            "_counts": observed_counts(ora["ORA Error"]),
+            "Warnings": len(entry["df_warn"]),
+            "Kill Sessions": len(entry["df_kill"]),
+            "Crash Events": len(info["Crash Events"]),
+            "Last Crash": _latest(info["Crash Events"]),
+            "Last Startup": _latest(info["Startup Events"]),
+            "Last Entry": last_entry,
+        })
+    if not rows:
+        return pd.DataFrame(columns=FLEET_COLUMNS)
+
+    summary = []
+    for (host, instance), group in pd.DataFrame(rows).groupby(["Host", "Instance"], sort=True):
+        counts = pd.concat(list(group["_counts"])).groupby(level=0, observed=True).sum()
+        summary.append({
+            "Host": host,
+            "Instance": instance,
+            "Files": int(group["Files"].sum()),
+            "Oracle Release": ", ".join(sorted({r for r in group["Oracle Release"] if r})),
+            "ORA Errors": int(group["ORA Errors"].sum()),
+            "Unique ORA Codes": int((counts > 0).sum()),
+            "Top ORA Error": str(counts.idxmax()) if not counts.empty and counts.max() > 0 else "",
+            "Warnings": int(group["Warnings"].sum()),
+            "Kill Sessions": int(group["Kill Sessions"].sum()),
+            "Crash Events": int(group["Crash Events"].sum()),
+            "Last Crash": group["Last Crash"].max(),
+            "Last Startup": group["Last Startup"].max(),
+            "Last Entry": group["Last Entry"].max(),
+        })
+    return pd.DataFrame(summary, columns=FLEET_COLUMNS).sort_values(
+        ["Crash Events", "ORA Errors"], ascending=False, ignore_index=True
+    )
+
+
+# ---------------- Export ----------------
+# format -> (file extension, MIME type); csv and parquet hold one file per table in a zip
+EXPORT_FORMATS = {
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": (".zip", "application/zip"),
+    "parquet": (".zip", "application/zip"),
+    "jsonl": (".jsonl", "application/x-ndjson"),
+}
+EXCEL_MAX_ROWS = 1_048_576  # rows per worksheet, header included
+EXCEL_MAX_SHEET_NAME = 31
+
+
+def export_chunks(frames, chunk_rows=EXPORT_CHUNK_ROWS, naive=False):
+    """
+    Shallow-copied slices of at most chunk_rows rows, so no writer copies a
+    whole table; naive=True converts them with export_ready() (for Excel).
+    """
+    for df in frames:
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            yield export_ready(chunk) if naive else chunk.copy(deep=False)
+
+
+def _iso_with_offset(values):
+    """tz-aware datetimes as ISO 8601 strings to the microsecond with their own UTC offset (NaT stays null)."""
+    text = values.dt.strftime("%Y-%m-%dT%H:%M:%S.%f%z")
+    return text.str[:-2] + ":" + text.str[-2:]
+
+
+def write_jsonl(tables, out):
+    """
+    tables (name -> list of DataFrames) as one JSON object per row, tagged
+    with its "Table". Timestamps keep their microseconds and UTC offset
+    (to_json alone would round to milliseconds and convert to UTC "Z").
+    """
+    for table, frames in tables.items():
+        for chunk in export_chunks(frames):
+            chunk.insert(0, "Table", table)
+            for col in chunk.columns:
+                if pd.api.types.is_datetime64_any_dtype(chunk[col]) and getattr(chunk[col].dt, "tz", None) is not None:
+                    chunk[col] = _iso_with_offset(chunk[col])
+            text = chunk.to_json(orient="records", lines=True, date_format="iso", date_unit="us", force_ascii=False)
+            out.write(text if text.endswith("\n") else text + "\n")
+
+
+def write_csv(frames, out):
+    """Frames with the same columns as one CSV (text handle), header written once."""
+    header = True
+    for chunk in export_chunks(frames):
+        chunk.to_csv(out, index=False, header=header)
+        header = False
+    if header and frames:
+        frames[0].iloc[:0].to_csv(out, index=False)
+
+
+def write_parquet(frames, out):
+    """Frames with the same columns as one Parquet file, one row group per chunk (needs pyarrow)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in export_chunks(frames):
+            # Plain strings: each file's categoricals have their own categories
+            for col in chunk.columns:
+                if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+                    chunk[col] = chunk[col].astype(object)
+            if writer is None:
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                schema = pa.schema([
+                    field.with_type(pa.string()) if pa.types.is_null(field.type) else field for field in schema
+                ], metadata=schema.metadata)
+                writer = pq.ParquetWriter(out, schema)
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        if writer is None and frames:
+            frames[0].iloc[:0].astype(object).to_parquet(out, index=False)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _excel_rows(chunk):
+    """Rows of plain Python values xlsxwriter can write (NaN/NaT become blank cells)."""
+    columns = []
+    for col in chunk.columns:
+        values = chunk[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            columns.append([None if pd.isna(v) else v.to_pydatetime() for v in values])
+        else:
+            values = values.astype(object)
+            columns.append(values.where(values.notna(), None).tolist())
+    return zip(*columns)
+
+
+def write_excel(tables, out, max_rows=EXCEL_MAX_ROWS):
+    """
+    tables (name -> list of DataFrames) as an .xlsx workbook in xlsxwriter's
+    constant_memory mode: rows are flushed to disk as they are written. A
+    table longer than one worksheet continues on "<name>_2", "<name>_3", ...
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(out, {"constant_memory": True, "default_date_format": "yyyy-mm-dd hh:mm:ss.000"})
+    try:
+        for table, frames in tables.items():
+            if not any(len(df) for df in frames):
+                continue
+            header = list(frames[0].columns)
+            sheet, row, part = None, max_rows, 0
+            for chunk in export_chunks(frames, naive=True):
+                for values in _excel_rows(chunk):
+                    if row >= max_rows:
+                        part += 1
+                        suffix = "" if part == 1 else f"_{part}"
+                        sheet = workbook.add_worksheet(table[:EXCEL_MAX_SHEET_NAME - len(suffix)] + suffix)
+                        sheet.write_row(0, 0, header)
+                        row = 1
+                    sheet.write_row(row, 0, values)
+                    row += 1
+    finally:
+        workbook.close()
+
+
+def write_export(tables, fmt, out):
+    """Write tables (name -> list of DataFrames) to a binary handle in one of EXPORT_FORMATS."""
+    if fmt == "xlsx":
+        write_excel(tables, out)
+    elif fmt == "jsonl":
+        text = io.TextIOWrapper(out, encoding="utf-8", newline="")
+        write_jsonl(tables, text)
+        text.detach()
+    elif fmt in ("csv", "parquet"):
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for table, frames in tables.items():
+                with archive.open(f"{table}.{fmt}", "w", force_zip64=True) as member:
+                    if fmt == "csv":
+                        text = io.TextIOWrapper(member, encoding="utf-8", newline="")
+                        write_csv(frames, text)
+                        text.detach()
+                    else:
+                        write_parquet(frames, member)
+    else:
+        raise ValueError(f"unknown export format: {fmt}")
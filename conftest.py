@@ -0,0 +1 @@
+# Lets pytest import alert_core / alert_cli from the repository root.
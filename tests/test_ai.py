@@ -0,0 +1,119 @@
+# Map-reduce AI summaries against a local stand-in for the chat completions endpoint.
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import alert_ai
+from alert_ai import AIClient, AIResponseCache, summarize
+
+LINES = ["2025-10-14T10:%02d:00.000000+05:30 ORA-00600: internal error code [%d]" % (i, i) for i in range(40)]
+
+
+class StubServer(ThreadingHTTPServer):
+    """Answers map prompts with "summary of part N" and reduce prompts with every line it was given."""
+
+    daemon_threads = True
+
+    def __init__(self, fail_status=None):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.fail_status = fail_status  # answer the first attempt of every prompt with this status
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+        self.requests = []
+        self.failed = set()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_port}/v1/chat/completions"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        prompt = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["messages"][1]["content"]
+        with server.lock:
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            server.requests.append(prompt)
+            fail = server.fail_status and prompt not in server.failed
+            server.failed.add(prompt)
+        try:
+            time.sleep(0.05)
+            if fail:
+                self.send_response(server.fail_status)
+                self.end_headers()
+                self.wfile.write(b'{"message": "try again"}')
+                return
+            if "Part Summaries:" in prompt:
+                reply = "merged: " + " | ".join(l for l in prompt.splitlines() if l.startswith("summary of"))
+            else:
+                reply = "summary of part " + prompt.split("part ", 1)[1].split(" of", 1)[0]
+            body = json.dumps({"choices": [{"message": {"role": "assistant", "content": reply}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+@pytest.fixture
+def stub(request, monkeypatch):
+    server = StubServer(getattr(request, "param", None))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(alert_ai, "MISTRAL_API_URL", server.url)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client(**kwargs):
+    kwargs.setdefault("concurrency", 2)
+    return AIClient("test-key", rate=0, backoff=0.01, **kwargs)
+
+
+def test_map_reduce_stays_within_concurrency(stub):
+    summary, stats = summarize(client(), LINES, "find problems", chunk_chars=400)
+    assert stats["chunks"] > 4
+    assert stub.peak <= 2
+    assert stats["failed"] == 0 and stats["retries"] == 0
+    # The reduce request saw every part's summary
+    assert summary == "merged: " + " | ".join(f"summary of part {k}" for k in range(1, stats["chunks"] + 1))
+    assert "Part Summaries:" in stub.requests[-1]
+
+
+@pytest.mark.parametrize("stub", [429, 503], indirect=True)
+def test_retryable_status_backs_off(stub):
+    sleeps = []
+    ai = client(sleep=sleeps.append)
+    summary, stats = summarize(ai, LINES, "find problems", chunk_chars=400)
+    assert summary.startswith("merged: summary of part 1 |")
+    assert stats["failed"] == 0
+    # Every prompt failed once and was sent again after a jittered backoff
+    assert stats["retries"] == len(stub.failed) == stats["requests"] - stats["retries"]
+    assert len(sleeps) == stats["retries"]
+    assert all(0.005 <= s <= 0.01 for s in sleeps)
+
+
+def test_repeat_call_is_served_from_cache(stub, tmp_path):
+    cache = AIResponseCache(str(tmp_path))
+    first, stats = summarize(client(cache=cache), LINES, "find problems", chunk_chars=400)
+    sent = len(stub.requests)
+    assert stats["cached"] == 0 and cache.hits == 0
+
+    again, stats = summarize(client(cache=cache), LINES, "find problems", chunk_chars=400)
+    assert again == first
+    assert len(stub.requests) == sent
+    assert stats["requests"] == 0 and stats["cached"] == stats["chunks"] + 1
+    assert cache.hits == stats["cached"]
@@ -0,0 +1,102 @@
+# Chunked (multi-process) parsing must match the serial parser exactly.
+
+import io
+
+import pytest
+
+from alert_core import BackgroundParse, parse_alert_log_chunked, parse_alert_log_file
+
+TABLES = ("df_ora", "df_warn", "df_kill")
+SEARCH = ("ora", "warnings", "kill_sessions")
+
+
+def build_log():
+    """
+    A small alert log mixing every kind of hit with kill-session blocks, .trc
+    paths on a hit's own line or a few lines after it, CRLF line ends,
+    invalid UTF-8 and lines ahead of the first timestamp.
+    """
+    parts = [b"ORA-00001: unique constraint violated before any timestamp\n", b"\n"]
+    for i in range(40):
+        nl = b"\r\n" if i % 3 == 0 else b"\n"
+        parts += [
+            b"2025-10-14T10:%02d:%02d.123456+05:30" % (i // 60, i % 60) + nl,
+            b"Errors in file /u01/diag/trace/ORCL_ora_%d.trc:" % i + nl if i % 2 else b"",
+            b"ORA-07445: exception encountered: core dump, see /u01/diag/trace/ORCL_ora_%d.trc" % i + nl
+            if i % 10 == 1 else b"",
+            b"ORA-00600: internal error code, arguments: [%d]" % i + nl,
+            b"noise \xff\xfe line " + nl,
+            b"/u01/diag/trace/ORCL_ora_%d.trc" % (1000 + i) + nl,
+            b"WARNING: inbound connection timed out (ORA-3136)" + nl if i % 4 == 0 else b"",
+            b"KILL SESSION for sid=(%d, %d):" % (i, 40000 + i) + nl,
+            b"  Reason = alter system kill session" + nl,
+            b"  Mode = KILL SOFT -/-/-" + nl,
+            b"  Requestor = USER (orapid = 45, ospid = 1234, inst = 1)" + nl,
+            b"  Owner = Process: USER (orapid = 60, ospid = 5678)" + nl,
+            b"  Result = ORA-0" + nl,
+            b"Starting ORACLE instance (normal)" + nl if i == 5 else b"",
+            b"Instance name: ORCL1" + nl if i == 5 else b"",
+        ]
+    parts.append(b"ORA-01555: snapshot too old, no newline at the end")
+    return b"".join(parts)
+
+
+LOG = build_log()
+CHUNK_SIZES = [1, 7, 97, 1000, 5000, len(LOG)]
+
+
+def comparable(entry):
+    """Everything a parse entry holds, in a form == can compare."""
+    trace_index = entry["trace_index"]
+    rest = {k: v for k, v in entry.items() if k not in TABLES + ("search", "trace_index")}
+    return rest, (trace_index.positions, trace_index.paths)
+
+
+@pytest.fixture(scope="module")
+def log_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("logs") / "alert_ORCL1.log"
+    path.write_bytes(LOG)
+    return path
+
+
+@pytest.fixture(scope="module")
+def serial(log_path):
+    return parse_alert_log_file(str(log_path), "alert_ORCL1.log")
+
+
+@pytest.mark.parametrize("chunk_bytes", CHUNK_SIZES)
+@pytest.mark.parametrize("as_path", [False, True], ids=["bytes", "path"])
+def test_chunked_matches_serial(serial, log_path, chunk_bytes, as_path):
+    source = str(log_path) if as_path else LOG
+    chunked = parse_alert_log_chunked(source, "alert_ORCL1.log", max_workers=2, chunk_bytes=chunk_bytes)
+    assert comparable(chunked) == comparable(serial)
+    for key in TABLES:
+        assert chunked[key].equals(serial[key]), key
+    for key in SEARCH:
+        assert chunked["search"][key].equals(serial["search"][key]), key
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_background_matches_serial(serial, workers):
+    # Uploads are handed over as a memoryview of their buffer, not a copy
+    job = BackgroundParse([("alert_ORCL1.log", io.BytesIO(LOG).getbuffer())], workers=workers, chunk_bytes=97)
+    assert job.join(60) and job.error is None
+    assert comparable(job.entries[0]) == comparable(serial)
+    for key in TABLES:
+        assert job.entries[0][key].equals(serial[key]), key
+
+
+def test_background_cancel_is_not_an_error():
+    job = BackgroundParse([("a.log", LOG), ("b.log", LOG)], chunk_bytes=7)
+    job.cancel()
+    assert job.join(60)
+    assert job.error is None and job.entries == {}
+
+
+def test_log_covers_edge_cases(serial):
+    assert len(serial["df_kill"]) == 40
+    traces = set(serial["df_ora"]["Trace File"].astype(str))
+    assert "/u01/diag/trace/ORCL_ora_1.trc" in traces  # on the hit's own line
+    assert {"/u01/diag/trace/ORCL_ora_%d.trc" % (1000 + i) for i in range(40)} <= traces  # looked ahead
+    assert "Not Found" in traces
+    assert b"\r\n" in LOG and b"\xff" in LOG
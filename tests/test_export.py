@@ -0,0 +1,22 @@
+# JSON Lines export keeps each timestamp exactly as the log wrote it.
+
+import io
+import json
+
+from alert_core import parse_alert_log_file, write_export
+
+LOG = (
+    b"ORA-00001: unique constraint violated before any timestamp\n"
+    b"2025-10-14T10:00:00.123456+05:30\n"
+    b"ORA-00600: internal error code\n"
+)
+
+
+def test_jsonl_keeps_microseconds_and_offset():
+    entry = parse_alert_log_file(io.BytesIO(LOG), "alert_ORCL1.log")
+    out = io.BytesIO()
+    write_export({"ORA_Errors": [entry["df_ora"]]}, "jsonl", out)
+    rows = [json.loads(line) for line in out.getvalue().decode("utf-8").splitlines()]
+    assert [row["Table"] for row in rows] == ["ORA_Errors", "ORA_Errors"]
+    assert rows[0]["ParsedTimestamp"] is None
+    assert rows[1]["ParsedTimestamp"] == "2025-10-14T10:00:00.123456+05:30"
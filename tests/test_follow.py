@@ -0,0 +1,53 @@
+# Follow mode must match a full parse and leave an unchanged file's entry alone.
+
+from alert_core import FollowedLog, parse_alert_log_file
+
+BLOCK = (
+    b"2025-10-14T10:%02d:00.000000+05:30\n"
+    b"ORA-00600: internal error code, arguments: [%d]\n"
+    b"/u01/diag/trace/ORCL_ora_%d.trc\n"
+)
+
+
+def block(i):
+    return BLOCK % (i % 60, i, i)
+
+
+def test_follow_matches_full_parse(tmp_path):
+    path = tmp_path / "alert_ORCL1.log"
+    path.write_bytes(b"")
+    log = FollowedLog(str(path), "alert_ORCL1.log")
+    for i in range(60):
+        with open(path, "ab") as fh:
+            fh.write(block(i))
+        log.refresh()
+    full = parse_alert_log_file(str(path), "alert_ORCL1.log")
+    for key in ("df_ora", "df_warn", "df_kill"):
+        assert log.entry[key].astype(object).equals(full[key].astype(object)), key
+    assert log.entry["line_count"] == full["line_count"]
+    assert log.entry["trace_index"].paths == full["trace_index"].paths
+    assert len(log.parts) < 12  # merged pairwise, not one part per refresh
+
+
+def test_unchanged_refresh_keeps_entry(tmp_path):
+    path = tmp_path / "alert_ORCL1.log"
+    path.write_bytes(block(0) + block(1))
+    log = FollowedLog(str(path), "alert_ORCL1.log")
+    assert log.refresh() > 0
+    entry = log.entry
+    assert not log.changed()
+    assert log.refresh() == 0
+    assert log.entry is entry
+
+    # A partial line is not parsed until it is complete
+    with open(path, "ab") as fh:
+        fh.write(b"2025-10-14T11:00:00.000000+05:30")
+    assert log.changed()
+    assert log.refresh() == 0
+    assert log.entry is entry
+
+    with open(path, "ab") as fh:
+        fh.write(b"\nORA-01555: snapshot too old\n")
+    assert log.refresh() > 0
+    assert log.entry is not entry
+    assert len(log.entry["df_ora"]) == 3
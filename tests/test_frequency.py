@@ -0,0 +1,40 @@
+# The frequency chart's table must give every ORA code a bar in every bucket.
+
+from alert_core import error_frequency, parse_alert_log_file
+
+LOG = (
+    b"2025-10-14T10:05:00.000000+05:30\n"
+    b"ORA-00600: internal error code\n"
+    b"2025-10-14T10:40:00.000000+05:30\n"
+    b"ORA-00600: internal error code\n"
+    b"2025-10-14T11:15:00.000000+05:30\n"
+    b"ORA-01555: snapshot too old\n"
+    b"2025-10-15T12:00:00.000000+05:30\n"
+    b"ORA-00600: internal error code\n"
+)
+
+
+def parsed_ora(tmp_path):
+    path = tmp_path / "alert_ORCL1.log"
+    path.write_bytes(LOG)
+    return parse_alert_log_file(str(path), "alert_ORCL1.log")["df_ora"]
+
+
+def test_hourly_fills_codes_missing_from_a_bucket(tmp_path):
+    freq = error_frequency(parsed_ora(tmp_path), hourly=True)
+    counts = {(str(b.hour), code): n for b, code, n in zip(freq["TimeBucket"], freq["ORA Error"], freq["Count"])}
+    assert counts == {
+        ("10", "ORA-00600"): 2, ("10", "ORA-01555"): 0,
+        ("11", "ORA-00600"): 0, ("11", "ORA-01555"): 1,
+        ("12", "ORA-00600"): 1, ("12", "ORA-01555"): 0,
+    }
+    first = freq.iloc[0]
+    assert first["SampleMinutes"] == "2025-10-14 10:05, 2025-10-14 10:40"
+    assert freq.loc[freq["Count"] == 0, "SampleMinutes"].eq("").all()
+
+
+def test_daily_buckets(tmp_path):
+    freq = error_frequency(parsed_ora(tmp_path), hourly=False)
+    assert len(freq) == 4
+    assert freq["Count"].tolist() == [2, 1, 1, 0]
+    assert freq["SampleMinutes"].tolist() == ["2025-10-14", "2025-10-14", "2025-10-15", ""]
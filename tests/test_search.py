@@ -0,0 +1,28 @@
+# Regex search matches inside one column of the search text, never across two.
+
+import pandas as pd
+
+from alert_core import ORA_SEARCH_COLUMNS, build_search_text, search_mask
+
+ORA = pd.DataFrame({
+    "ORA Error": pd.Categorical(["ORA-00600", "ORA-01555"]),
+    "Trace File": ["Not Found", "/u01/diag/trace/ORCL_ora_7.trc"],
+    "Source": ["alert_ORCL1.log", "alert_ORCL2.log"],
+})
+
+
+def matches(query):
+    return search_mask(build_search_text(ORA, ORA_SEARCH_COLUMNS), query, regex=True).tolist()
+
+
+def test_regex_stays_within_a_column():
+    assert matches(r"00600\snot") == [False, False]
+    assert matches(r"00600.not") == [False, False]
+    assert matches(r"found[^!]*alert") == [False, False]
+
+
+def test_regex_matches_each_column():
+    assert matches(r"^not found$") == [True, False]
+    assert matches(r"ORA-0\d{4}") == [True, True]
+    assert matches(r"orcl_ora_\d+\.TRC") == [False, True]
+    assert matches(r"orcl2") == [False, True]